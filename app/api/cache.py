@@ -0,0 +1,120 @@
+# app/api/cache.py
+"""In-process TTL caching for the API's read paths."""
+
+import asyncio
+import functools
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from cachetools import TTLCache
+
+
+def _always(_: Any) -> bool:
+    return True
+
+
+def single_flight(fn):
+    """Coalesce concurrent calls with the same positional args into one.
+
+    The first caller starts the coroutine; callers arriving while it is in
+    flight await the same future. The entry is dropped once it settles, so
+    the in-flight map is bounded by the number of distinct keys being read
+    at that moment.
+    """
+    inflight: dict[Any, asyncio.Future] = {}
+
+    @functools.wraps(fn)
+    async def wrapper(*args):
+        fut = inflight.get(args)
+        if fut is None:
+            fut = asyncio.ensure_future(fn(*args))
+            inflight[args] = fut
+            fut.add_done_callback(lambda _: inflight.pop(args, None))
+        # shield so one cancelled waiter does not cancel the shared read
+        return await asyncio.shield(fut)
+
+    return wrapper
+
+
+def async_cached(
+    ttl: float,
+    maxsize: int = 32,
+    should_cache: Callable[[Any], bool] = _always,
+):
+    """Cache the result of a coroutine function per positional-args key.
+
+    Misses go through :func:`single_flight`, so concurrent misses for the
+    same key share one upstream read.
+
+    Args:
+        ttl (float): Seconds a cached result stays valid.
+        maxsize (int): Maximum number of cached keys.
+        should_cache (Callable[[Any], bool]): Predicate deciding whether a
+            result is stored (e.g. to skip error payloads).
+    """
+
+    def decorator(fn):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @single_flight
+        async def load(*args):
+            result = await fn(*args)
+            if should_cache(result):
+                cache[args] = result
+            return result
+
+        @functools.wraps(fn)
+        async def wrapper(*args):
+            try:
+                return cache[args]
+            except KeyError:
+                return await load(*args)
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def cached(
+    ttl: float,
+    maxsize: int = 32,
+    should_cache: Callable[[Any], bool] = _always,
+):
+    """Synchronous counterpart of :func:`async_cached` for threadpool handlers.
+
+    Concurrent misses are not coalesced; the lock only guards the cache.
+
+    Args:
+        ttl (float): Seconds a cached result stays valid.
+        maxsize (int): Maximum number of cached keys.
+        should_cache (Callable[[Any], bool]): Predicate deciding whether a
+            result is stored (e.g. to skip error payloads).
+    """
+
+    def decorator(fn):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            with lock:
+                try:
+                    return cache[args]
+                except KeyError:
+                    pass
+            result = fn(*args)
+            if should_cache(result):
+                with lock:
+                    cache[args] = result
+            return result
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -1,20 +1,88 @@
 # app/api/main.py
-from datetime import datetime, timedelta
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Final
 
+import orjson
 import secure
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from slowapi import Limiter
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from google.api_core import exceptions as google_exceptions
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
 
+from app.api.cache import async_cached, cached
+from app.config import get_app_settings
 from app.storage.firestore import default_repo, FirestoreRepo
-from app.storage.bigquery import default_bq_repo, BigQueryRepo
-from app.constants import TIMEZONE
+from app.storage.bigquery import default_bq_repo, summary_time, BigQueryRepo
+from app.constants import (
+    TIMEZONE,
+    CURRENT_SENTIMENT_CACHE_TTL_SECONDS,
+    DAY_HISTORY_CACHE_TTL_SECONDS,
+    LONG_HISTORY_CACHE_TTL_SECONDS,
+    HISTORY_HTTP_MAX_AGE_SECONDS,
+    WEEKLY_ROLLUP_MAX_STALENESS_SECONDS,
+)
+
+log = logging.getLogger("api.main")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open Firestore/BigQuery channels before the first request is served.
+
+    The repos are stored on ``app.state`` and read from there by the handlers.
+    Warm-up failures are logged rather than raised so the API still starts.
+    If a repo could not even be constructed its state slot stays ``None`` and
+    the first request builds it through :func:`_firestore_repo` /
+    :func:`_bigquery_repo`, paying the connection cost instead.
+    """
+    app.state.repo = None
+    app.state.bq_repo = None
+    try:
+        app.state.repo = default_repo()
+        app.state.repo.healthcheck()
+        await app.state.repo.ahealthcheck()
+    except Exception:
+        log.exception("Firestore warm-up failed")
+    try:
+        app.state.bq_repo = default_bq_repo()
+        app.state.bq_repo.healthcheck()
+    except Exception:
+        log.exception("BigQuery warm-up failed")
+    yield
+
 
-app = FastAPI()
-app.state.limiter = Limiter(key_func=get_remote_address)
+def _firestore_repo(request: Request) -> FirestoreRepo:
+    """Return the lifespan's Firestore repo, building it on first use if needed."""
+    repo = getattr(request.app.state, "repo", None)
+    if repo is None:
+        repo = request.app.state.repo = default_repo()
+    return repo
+
+
+def _bigquery_repo(request: Request) -> BigQueryRepo:
+    """Return the lifespan's BigQuery repo, building it on first use if needed."""
+    repo = getattr(request.app.state, "bq_repo", None)
+    if repo is None:
+        repo = request.app.state.bq_repo = default_bq_repo()
+    return repo
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app_settings = get_app_settings()
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=app_settings.RATELIMIT_STORAGE_URI,
+    strategy=app_settings.RATELIMIT_STRATEGY,
+)
+app.state.limiter = limiter
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,76 +92,160 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Secure headers middleware using secure.Secure
-secure_headers = secure.Secure.with_default_headers()
+# Secure headers middleware. secure.Secure is only the source of truth at
+# import time: names/values are encoded once here and the middleware just
+# splices them into the ASGI response-start message.
+_HEADERS: Final[tuple[tuple[bytes, bytes], ...]] = tuple(
+    (k.lower().encode("latin-1"), v.encode("latin-1"))
+    for k, v in secure.Secure.with_default_headers().headers.items()
+)
+_HEADER_NAMES: Final[frozenset[bytes]] = frozenset(name for name, _ in _HEADERS)
+
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware that appends the secure default headers.
+
+    Avoids ``BaseHTTPMiddleware``, which wraps every request in an anyio task
+    group and memory streams.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = [
+                    h for h in message.get("headers", []) if h[0] not in _HEADER_NAMES
+                ]
+                headers.extend(_HEADERS)
+                message["headers"] = headers
+            await send(message)
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        await secure_headers.set_headers_async(response)
-        return response
+        await self.app(scope, receive, send_wrapper)
 
 
+app.add_middleware(GZipMiddleware, minimum_size=500)
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(SlowAPIMiddleware)
+# Limits are enforced by the @limiter.limit decorators on each route; no
+# middleware pass is needed, only the 429 rendering.
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
-def get_repo() -> FirestoreRepo:
-    return default_repo()
+def _is_cacheable(result) -> bool:
+    """Skip caching error payloads and empty reads."""
+    if not result:
+        return False
+    return not (isinstance(result, dict) and "error" in result)
 
 
-def get_bq_repo() -> BigQueryRepo:
-    return default_bq_repo()
+@async_cached(ttl=CURRENT_SENTIMENT_CACHE_TTL_SECONDS, should_cache=_is_cacheable)
+async def _latest_sentiment(repo: FirestoreRepo):
+    return await repo.aget_latest_sentiment()
 
 
-@app.get("/")
-def read_root():
-    return {"message": "Hello, World!"}
+@async_cached(ttl=DAY_HISTORY_CACHE_TTL_SECONDS, should_cache=_is_cacheable)
+async def _day_history(repo: FirestoreRepo, num_days: int):
+    return await repo.aget_recent_sentiment_history(num_days)
+
+
+@async_cached(ttl=LONG_HISTORY_CACHE_TTL_SECONDS, should_cache=_is_cacheable)
+async def _long_history(repo: FirestoreRepo, num_days: int):
+    return await repo.aget_recent_sentiment_history(num_days)
+
+
+# sync: BigQuery has no async client, so this runs in the threadpool
+@cached(ttl=LONG_HISTORY_CACHE_TTL_SECONDS, maxsize=4, should_cache=_is_cacheable)
+def _weekly_rollup(repo: BigQueryRepo, today: date):
+    """Keyed on the calendar day, so the entry rotates at midnight on its own.
+
+    Falls back to querying the history table when the rollup is missing or
+    its newest row shows the daily refresh has stalled.
+    """
+    start = today - timedelta(days=7)
+    try:
+        rows = repo.get_weekly_rollup(since=start)
+    except google_exceptions.NotFound:
+        rows = []
+    stamps = [ts for ts in map(summary_time, rows) if ts is not None]
+    max_staleness = timedelta(seconds=WEEKLY_ROLLUP_MAX_STALENESS_SECONDS)
+    if stamps and datetime.now(TIMEZONE) - max(stamps) <= max_staleness:
+        return rows
+    return repo.get_global_sentiment_history_by_day_range(start, today)
 
 
-# TODO: convert timestamps into ISO strings before returning results. do it in pydantic?
+def _cacheable_json(request: Request, payload, max_age: int) -> Response:
+    """Render ``payload`` with an ETag and Cache-Control; 304 on a matching tag.
+
+    Empty reads and error payloads (what the repos return on a failed read)
+    are sent with ``no-store`` and no ETag so a transient outage is not
+    cached downstream.
+    """
+    body = orjson.dumps(jsonable_encoder(payload))
+    if not _is_cacheable(payload):
+        return Response(
+            body, media_type="application/json", headers={"Cache-Control": "no-store"}
+        )
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+        ),
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/")
+async def read_root():
+    return {"message": "Hello, World!"}
 
 
 @app.get("/sentiment/current")
-@app.state.limiter.limit("10/minute")
-def get_current_sentiment(request: Request, repo=Depends(get_repo)):
-    return repo.get_latest_sentiment()
+@limiter.limit("10/minute")
+async def get_current_sentiment(request: Request):
+    return await _latest_sentiment(_firestore_repo(request))
 
 
 @app.get("/sentiment/day")
-@app.state.limiter.limit("2/minute")
-def get_past_day_sentiment(request: Request, repo=Depends(get_repo)):
+@limiter.limit("2/minute")
+async def get_past_day_sentiment(request: Request):
     # TODO: make this a variable
-    return repo.get_recent_sentiment_history(1)
+    history = await _day_history(_firestore_repo(request), 1)
+    return _cacheable_json(request, history, HISTORY_HTTP_MAX_AGE_SECONDS)
 
 
 @app.get("/sentiment/week")
-@app.state.limiter.limit("2/minute")
-def get_past_week_sentiment(request: Request, repo=Depends(get_repo)):
-    return repo.get_recent_sentiment_history(7)
+@limiter.limit("2/minute")
+async def get_past_week_sentiment(request: Request):
+    history = await _long_history(_firestore_repo(request), 7)
+    return _cacheable_json(request, history, HISTORY_HTTP_MAX_AGE_SECONDS)
 
 
 @app.get("/sentiment/v2/week")
-@app.state.limiter.limit("2/minute")
-def get_past_week_sentiment_v2(request: Request, repo=Depends(get_bq_repo)):
+@limiter.limit("2/minute")
+def get_past_week_sentiment_v2(request: Request):
     """get sentiment from 7 days ago to today from bigquery"""
-    now = datetime.now(TIMEZONE)
-    seven_days_ago = now - timedelta(days=7)
-    return repo.get_global_sentiment_history_by_day_range(
-        seven_days_ago.date(), now.date()
-    )
+    history = _weekly_rollup(_bigquery_repo(request), datetime.now(TIMEZONE).date())
+    return _cacheable_json(request, history, HISTORY_HTTP_MAX_AGE_SECONDS)
 
 
 @app.get("/sentiment/month")
-@app.state.limiter.limit("2/minute")
-def get_past_month_sentiment(request: Request, repo=Depends(get_repo)):
-    return repo.get_recent_sentiment_history(31)
+@limiter.limit("2/minute")
+async def get_past_month_sentiment(request: Request):
+    history = await _long_history(_firestore_repo(request), 31)
+    return _cacheable_json(request, history, HISTORY_HTTP_MAX_AGE_SECONDS)
 
 
 @app.get("/_ah/warmup")
-@app.state.limiter.exempt
-def warmup(repo=Depends(get_repo)):
+@limiter.exempt
+def warmup(request: Request):
     """
     Called by App Engine before routing real traffic to a new instance.
     Do lightweight tasks that pay the one-time cold costs:
@@ -102,7 +254,7 @@ def warmup(repo=Depends(get_repo)):
       - first query compiled
     """
     try:
-        repo.healthcheck()
+        _firestore_repo(request).healthcheck()
         return {"status": "ok"}
     except Exception as e:
         return {"status": "degraded", "error": str(e)}
@@ -4,20 +4,30 @@ from functools import lru_cache
 from pathlib import Path
 
 
+from dotenv import load_dotenv
 from google.api_core.retry import Retry
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 env_name = os.getenv("APP_ENV", "dev")
 env_file = f".env.{env_name}"
+# Parse the dotenv file once into the process environment (variables already
+# set in the real environment win) rather than letting every settings class
+# re-open and re-parse it on instantiation.
+load_dotenv(env_file, override=False)
+
+# Settings objects are process-wide singletons (see the lru_cached getters
+# below), so every class is frozen: accidental mutation raises instead of
+# silently changing config for every caller, and instances are hashable.
 
 
 class AppSettings(BaseSettings):
-    model_config = SettingsConfigDict(
-        env_file=env_file, case_sensitive=True, extra="ignore"
-    )
+    model_config = SettingsConfigDict(case_sensitive=True, extra="ignore", frozen=True)
     GOOGLE_APPLICATION_CREDENTIALS: str | None = None
     API_OUTPUT_SCHEMA: str = "legacy"  # "legacy" or "new"
+    # e.g. "redis://redis:6379/0" so every worker/instance shares one counter
+    RATELIMIT_STORAGE_URI: str = "memory://"
+    RATELIMIT_STRATEGY: str = "moving-window"
 
 
 @lru_cache()
@@ -27,17 +37,18 @@ def get_app_settings() -> AppSettings:
 
 class AnnoWorkerSettings(BaseSettings):
     model_config = SettingsConfigDict(
-        env_file=env_file,
         case_sensitive=True,
         env_prefix="",
         env_nested_delimiter="__",
         secrets_dir=None,
         extra="ignore",
+        frozen=True,
     )
 
     RUN_ID: str
     WORKER_ID: str = Field(default_factory=lambda: "worker")
     LEASE_MIN: int = 30
+    LOAD_4BT: bool = True  # NF4 weights; takes precedence over LOAD_8BT
     LOAD_8BT: bool = True
     MAX_PROMPT_LEN: int = 1024
     MAX_NEW_TOKENS: int = 64
@@ -47,6 +58,14 @@ class AnnoWorkerSettings(BaseSettings):
     SOURCE_HF_REPO: str = "Nech-C/reddit-sentiment"
     HF_TOKEN: str
     ANN_MODEL_ID: str = "Qwen/Qwen3-4B-Instruct-2507"
+    ANN_BACKEND: str = "hf"  # "hf" (transformers pipeline) or "vllm"
+    # vLLM only: e.g. "awq"/"gptq" for a pre-quantized ANN_MODEL_ID checkpoint
+    ANN_QUANTIZATION: str | None = None
+    VLLM_GPU_MEMORY_UTILIZATION: float = 0.9
+    # restrict decoding to the score JSON instead of parsing free-form output
+    ANN_CONSTRAINED_DECODING: bool = True
+    # reuse prompt token ids across restarts; unset disables the cache
+    ANN_PROMPT_CACHE_DIR: str | None = None
 
     GCS_BUCKET: str
     GCS_PREFIX: str = "annotations"
@@ -80,17 +99,17 @@ class StorageSettings(BaseSettings):
     """
 
     model_config = SettingsConfigDict(
-        env_file=env_file,
         case_sensitive=True,
         env_prefix="FIRESTORE_",
         env_nested_delimiter="__",
         secrets_dir=None,
         extra="ignore",
+        frozen=True,
     )
     POST_ARCHIVE_COLLECTION_NAME: str
     SENTIMENT_HISTORY_COLLECTION_NAME: str
     CURRENT_SENTIMENT_COLLECTION_NAME: str
-    HISTORY_RETRIEVAL_LIMIT: int = (24 / 4) * 30  # 30 days, history taken every 4 hrs
+    HISTORY_RETRIEVAL_LIMIT: int = (24 // 4) * 30  # 30 days, history taken every 4 hrs
     DATABASE_ID: str
     GOOGLE_BUCKET_NAME: str
 
@@ -125,16 +144,19 @@ class InferenceSettings(BaseSettings):
     """
 
     model_config = SettingsConfigDict(
-        env_file=env_file,
         case_sensitive=True,
         env_prefix="",
         env_nested_delimiter="__",
         secrets_dir=None,
         extra="ignore",
+        frozen=True,
     )
 
     BATCH_MAX_TOKENS: int = 512
     SENTIMENT_MODEL_ID: str = "bhadresh-savani/distilbert-base-uncased-emotion"
+    # CPU threading; None uses every CPU visible to the process
+    INFER_INTRA_THREADS: int | None = None
+    INFER_INTEROP_THREADS: int = 1
 
 
 @lru_cache(maxsize=1)
@@ -151,12 +173,12 @@ class RedditSettings(BaseSettings):
     """Settings required for interacting with the Reddit API."""
 
     model_config = SettingsConfigDict(
-        env_file=env_file,
         case_sensitive=True,
         env_prefix="REDDIT_",
         env_nested_delimiter="__",
         secrets_dir=None,
         extra="ignore",
+        frozen=True,
     )
 
     CLIENT_ID: str
@@ -166,6 +188,8 @@ class RedditSettings(BaseSettings):
     USERNAME: str
     RATELIMIT_SECONDS: int = 600
     SUBREDDIT_JSON_PATH: str
+    FETCH_CONCURRENCY: int = 4
+    REQUESTS_PER_MINUTE: int = 100
 
     @field_validator(
         "CLIENT_ID",
@@ -205,16 +229,20 @@ class BigQuerySettings(BaseSettings):
     """Settings for BigQuery"""
 
     model_config = SettingsConfigDict(
-        env_file=env_file,
         case_sensitive=True,
         env_prefix="",
         extra="ignore",
+        frozen=True,
     )
     bq_dataset: str = Field(alias="BIGQUERY_DATASET_ID")
     bq_global_sentiment_history_table: str = Field(
         alias="BIGQUERY_GLOBAL_SENTIMENT_HISTORY_TABLE"
     )
     bq_global_sentiment_history_limit: int = 100
+    bq_global_sentiment_weekly_table: str = Field(
+        default="global_sentiment_weekly",
+        alias="BIGQUERY_GLOBAL_SENTIMENT_WEEKLY_TABLE",
+    )
     retry: Retry = Retry(
         initial=1.0,
         maximum=30.0,
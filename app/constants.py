@@ -12,6 +12,28 @@ TIMEZONE = timezone.utc
 # and strings throughout the codebase.
 DEFAULT_MAX_POST_AGE_DAYS = 7
 DEFAULT_SENTIMENT_SOURCE = "bert"
-DEFAULT_FETCH_SLEEP_SECONDS = 1
+# MoreComments nodes expanded when the top-level page has too few usable comments
+FALLBACK_REPLACE_MORE_LIMIT = 1
 DEFAULT_COMMENT_AUTHOR_PLACEHOLDER = "[deleted]"
 DEFAULT_BQ_TEXT_PREVIEW_MAX = 1024
+# Rows per BigQuery streaming insert request; keeps requests well under 10 MB.
+BQ_INSERT_BATCH_ROWS = 500
+
+# Sentiment snapshots are written every 4 hours.
+SENTIMENT_SNAPSHOTS_PER_DAY = 24 // 4
+
+# The BigQuery weekly rollup is rebuilt at most once a day. A rollup whose
+# newest row is older than one refresh plus one snapshot interval means the
+# refresh has stalled, and readers fall back to querying the history table.
+WEEKLY_ROLLUP_REFRESH_SECONDS = 24 * 3600
+WEEKLY_ROLLUP_MAX_STALENESS_SECONDS = (
+    WEEKLY_ROLLUP_REFRESH_SECONDS + 24 * 3600 // SENTIMENT_SNAPSHOTS_PER_DAY
+)
+
+# API response cache lifetimes (seconds). Snapshots are written every few
+# hours, so short TTLs bound staleness while absorbing bursts of reads.
+CURRENT_SENTIMENT_CACHE_TTL_SECONDS = 60
+DAY_HISTORY_CACHE_TTL_SECONDS = 900
+LONG_HISTORY_CACHE_TTL_SECONDS = 3600
+# Browser/CDN max-age for history responses.
+HISTORY_HTTP_MAX_AGE_SECONDS = 900
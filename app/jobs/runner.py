@@ -4,11 +4,13 @@
 import argparse
 import os
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
 
 from app.reddit.fetch import fetch_all_subreddit_posts_by_dict
-from app.ml.inference import run_batch_inference
-from app.processing.aggregate import compute_sentiment_average
+from app.ml.inference import run_batch_inference_matrix, warm_up
+from app.processing.aggregate import EMOTIONS, compute_sentiment_average
 from app.storage.firestore import default_repo
 from app.storage.bigquery import default_bq_repo
 
@@ -35,40 +37,46 @@ def main(
         f"🚀 Starting sentiment pipeline (method={method}, posts={num_posts}, comments={num_comments})"
     )
 
-    # Step 1: Fetch
-    raw_data = fetch_all_subreddit_posts_by_dict(
-        method=method,
-        posts_per_subreddit=num_posts,
-        comment_per_post=num_comments,
-        fetch_buffer=buffer,
-    )
+    # Step 1: Fetch, loading the classifier meanwhile (the fetch is network-bound)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        model_ready = pool.submit(warm_up)
+        raw_data = fetch_all_subreddit_posts_by_dict(
+            method=method,
+            posts_per_subreddit=num_posts,
+            comment_per_post=num_comments,
+            fetch_buffer=buffer,
+        )
+        model_ready.result()
 
     # Step 2: Flatten and prepare for inference
-    all_posts: list[Post] = [
-        post for cat in raw_data.values() for sub in cat for post in sub["posts"]
-    ]
-
-    texts = [
-        prepare_for_input(
-            post.post_title,
-            post.post_text,
-            [c.body for c in post.post_comments],
+    all_posts: list[Post] = list(
+        chain.from_iterable(sub["posts"] for cat in raw_data.values() for sub in cat)
+    )
+    texts: list[str] = []
+    for post in all_posts:
+        if not post.post_subreddit:
+            post.post_subreddit = "unknown"
+        texts.append(
+            prepare_for_input(
+                post.post_title,
+                post.post_text,
+                [c.body for c in post.post_comments],
+            )
         )
-        for post in all_posts
-    ]
 
     log.info(f"🧠 Running inference on {len(texts)} posts...")
-    predictions = run_batch_inference(texts)
+    labels, probs = run_batch_inference_matrix(texts)
     processing_timestamp = datetime.now(constants.TIMEZONE)
-    for i, post in enumerate(all_posts):
-        post.sentiment = Sentiment.model_validate(predictions[i])
+    for post, row in zip(all_posts, probs.tolist()):
+        post.sentiment = Sentiment.model_validate(dict(zip(labels, row)))
         post.processing_timestamp = processing_timestamp
         post.sentiment_analysis_model = constants.DEFAULT_SENTIMENT_SOURCE
-        if not post.post_subreddit:
-            post.post_subreddit = "unknown"
 
-    # Step 3: Aggregate
-    aggregated = compute_sentiment_average(all_posts)
+    # Step 3: Aggregate, reading scores from the inference matrix directly
+    sentiment_matrix = None
+    if set(EMOTIONS) <= set(labels):
+        sentiment_matrix = probs[:, [labels.index(e) for e in EMOTIONS]]
+    aggregated = compute_sentiment_average(all_posts, sentiment_matrix=sentiment_matrix)
 
     # Step 4: Store
     repo = default_repo()
@@ -78,6 +86,12 @@ def main(
     if history:
         repo.save_sentiment_history(aggregated)
         bq_repo.insert_global_sentiment_history(aggregated)
+        try:
+            bq_repo.refresh_weekly_rollup(
+                max_age=timedelta(seconds=constants.WEEKLY_ROLLUP_REFRESH_SECONDS)
+            )
+        except Exception:
+            log.exception("Failed to refresh the weekly BigQuery rollup")
     if archive:
         timestamp = processing_timestamp.isoformat()
         serialized_posts = [post.to_json_dict() for post in all_posts]
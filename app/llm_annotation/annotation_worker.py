@@ -1,20 +1,25 @@
 # file: app/llm_annotation/annotation_worker.py
-import re
 import gc
+import hashlib
+import importlib.util
 import logging
-import json
-from collections import Counter
+import os
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional, Any, Tuple
 from functools import lru_cache
+from pathlib import Path
 
+import orjson
+import pyarrow as pa
 import torch
+from google.api_core import exceptions as google_exceptions
 from google.cloud import firestore, storage
 from transformers import (
     AutoTokenizer,
     AutoModelForCausalLM,
     BitsAndBytesConfig,
-    pipeline,
 )
 from datasets import load_dataset
 
@@ -26,26 +31,168 @@ setup_logging()
 log = logging.getLogger("annotation_worker")
 metrics = Counter()
 
+# Chunks whose upload + heartbeat may still be running while the GPU moves on.
+MAX_PENDING_UPLOADS = 2
+
 
 @lru_cache(maxsize=1)
 def get_settings():
     return AnnoWorkerSettings()
 
 
+class HFGenerator:
+    """Greedy batched generation straight through ``model.generate``.
+
+    Prompts arrive as token ids (see :class:`PromptEncoder`), are left-padded
+    to the longest prompt in the batch (not to MAX_PROMPT_LEN), and only the
+    newly generated tokens are decoded.
+    """
+
+    def __init__(self, model, tokenizer, max_prompt_len: int, constrained=True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.encode_prompt = PromptEncoder(tokenizer, max_prompt_len)
+        self.grammar = ScoreGrammar(tokenizer) if constrained else None
+
+    def __call__(self, prompts: list[list[int]], max_new_tokens: int) -> list[str]:
+        enc = self.tokenizer.pad(
+            {"input_ids": prompts}, padding="longest", return_tensors="pt"
+        ).to(self.model.device, non_blocking=True)
+        prompt_len = enc["input_ids"].shape[1]
+        allowed_tokens = None
+        stop = {}
+        if self.grammar is None:
+            # the grammar already forces EOS after "}"; without it, stop there
+            stop = {"stop_strings": ["}"], "tokenizer": self.tokenizer}
+        else:
+
+            def allowed_tokens(batch_id, input_ids):
+                text = self.tokenizer.decode(
+                    input_ids[prompt_len:], skip_special_tokens=True
+                )
+                return self.grammar.allowed(text)
+
+        with torch.inference_mode():
+            out = self.model.generate(
+                **enc,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                num_beams=1,
+                use_cache=True,
+                output_scores=False,
+                return_dict_in_generate=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+                prefix_allowed_tokens_fn=allowed_tokens,
+                **stop,
+            )
+        return self.tokenizer.batch_decode(
+            out[:, prompt_len:], skip_special_tokens=True
+        )
+
+
+class VllmGenerator:
+    """Same call shape as :class:`HFGenerator`, backed by an in-process ``vllm.LLM``.
+
+    vLLM schedules its own batches (continuous batching over a paged KV cache),
+    so callers should hand it the whole chunk at once rather than going through
+    :func:`generate_with_adaptive_bs`.
+    """
+
+    def __init__(self, llm, max_prompt_len: int, constrained=True):
+        self.llm = llm
+        self.tokenizer = llm.get_tokenizer()
+        self.encode_prompt = PromptEncoder(self.tokenizer, max_prompt_len)
+        self.constrained = constrained
+
+    def __call__(self, prompts: list[list[int]], max_new_tokens: int) -> list[str]:
+        from vllm import SamplingParams
+        from vllm.sampling_params import GuidedDecodingParams
+
+        guided = GuidedDecodingParams(regex=SCORE_REGEX) if self.constrained else None
+        params = SamplingParams(
+            max_tokens=max_new_tokens, temperature=0.0, guided_decoding=guided
+        )
+        outs = self.llm.generate(
+            [{"prompt_token_ids": ids} for ids in prompts], params, use_tqdm=False
+        )
+        return [o.outputs[0].text for o in outs]
+
+
+def load_vllm(model_id: str, settings: AnnoWorkerSettings) -> VllmGenerator:
+    # optional dependency: only the vLLM backend needs it installed
+    from vllm import LLM
+
+    llm = LLM(
+        model=model_id,
+        quantization=settings.ANN_QUANTIZATION,
+        dtype=pick_compute_dtype(),
+        max_model_len=settings.MAX_PROMPT_LEN + settings.MAX_NEW_TOKENS,
+        gpu_memory_utilization=settings.VLLM_GPU_MEMORY_UTILIZATION,
+    )
+    return VllmGenerator(
+        llm, settings.MAX_PROMPT_LEN, constrained=settings.ANN_CONSTRAINED_DECODING
+    )
+
+
+def pick_attn_implementation() -> str:
+    """FlashAttention-2 when installed and the GPU supports it (Ampere+), else SDPA."""
+    if (
+        importlib.util.find_spec("flash_attn") is not None
+        and torch.cuda.is_available()
+        and torch.cuda.get_device_capability()[0] >= 8
+    ):
+        return "flash_attention_2"
+    return "sdpa"
+
+
+def pick_compute_dtype() -> torch.dtype:
+    """bfloat16 where the GPU runs it natively (Ampere+), else float16."""
+    if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16
+
+
+def bnb_quantization_config(
+    settings: AnnoWorkerSettings,
+) -> Optional[BitsAndBytesConfig]:
+    if settings.LOAD_4BT:
+        # LLM.int8 decomposes outliers on every matmul and often runs slower
+        # than fp16; NF4 halves weight bandwidth again with 16-bit compute
+        return BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=pick_compute_dtype(),
+            bnb_4bit_use_double_quant=True,
+        )
+    if settings.LOAD_8BT:
+        return BitsAndBytesConfig(load_in_8bit=True)
+    return None
+
+
 def load_pipeline(model_id: str, settings: AnnoWorkerSettings):
+    if settings.ANN_BACKEND == "vllm":
+        return load_vllm(model_id, settings)
+
     tok = AutoTokenizer.from_pretrained(
         model_id,
         token=settings.HF_TOKEN,
+        use_fast=True,
         padding_side="left",
         model_max_length=settings.MAX_PROMPT_LEN,
     )
+    if tok.pad_token is None:
+        tok.pad_token = tok.eos_token
 
-    if settings.LOAD_8BT:
-        bnb_config = BitsAndBytesConfig(load_in_8bit=True)
+    attn_implementation = pick_attn_implementation()
+    torch_dtype = pick_compute_dtype()
+    bnb_config = bnb_quantization_config(settings)
+    if bnb_config is not None:
         model = AutoModelForCausalLM.from_pretrained(
             model_id,
             token=settings.HF_TOKEN,
             quantization_config=bnb_config,
+            torch_dtype=torch_dtype,
+            attn_implementation=attn_implementation,
             device_map="auto",
         )
     else:
@@ -53,17 +200,21 @@ def load_pipeline(model_id: str, settings: AnnoWorkerSettings):
             model_id,
             token=settings.HF_TOKEN,
             trust_remote_code=True,
+            torch_dtype=torch_dtype,
+            attn_implementation=attn_implementation,
             device_map="auto",
         )
 
-    if getattr(model.config, "_attn_implementation", None) != "sdpa":
-        model.config._attn_implementation = "sdpa"
-    model.config.use_cache = False
+    # the KV cache must stay on: without it every new token re-runs the prompt
+    model.config.use_cache = True
+    log.info(f"[worker] attention: {model.config._attn_implementation}")
 
-    return pipeline("text-generation", model=model, tokenizer=tok)
+    return HFGenerator(
+        model, tok, settings.MAX_PROMPT_LEN, settings.ANN_CONSTRAINED_DECODING
+    )
 
 
-def build_prompt(tok, title: str, body: str, comments: List[str]):
+def _prompt_messages(post_text: str) -> List[Dict[str, str]]:
     rules = (
         "Score each sentiment as an integer 1..10 (1=absent, 5=noticeable, 10=dominant). "
         "Output ONLY JSON with keys: joy, sadness, anger, fear, love, surprise."
@@ -71,58 +222,203 @@ def build_prompt(tok, title: str, body: str, comments: List[str]):
 
     content = f"""You are an expert annotator of emotional tone in Reddit content.
             {rules}
-            {prepare_for_input(title, body, comments)}
+            {post_text}
             Return JSON only."""
 
-    messages = [{"role": "user", "content": content}]
+    return [{"role": "user", "content": content}]
+
+
+def build_prompt(tok, title: str, body: str, comments: List[str]):
+    messages = _prompt_messages(prepare_for_input(title, body, comments))
 
     return tok.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
 
 
+class PromptEncoder:
+    """Turn posts into prompt token ids, tokenizing only the posts themselves.
+
+    The chat-template scaffolding and the static instructions around the post
+    are identical for every prompt, so they are rendered and tokenized once
+    here; the posts of a chunk then go through a single batched tokenizer
+    call. Over-long posts are trimmed so the instructions and the generation
+    prompt always fit within ``max_prompt_len``.
+    """
+
+    _SLOT = "\x00POST\x00"
+
+    def __init__(self, tok, max_prompt_len: int):
+        rendered = tok.apply_chat_template(
+            _prompt_messages(self._SLOT), tokenize=False, add_generation_prompt=True
+        )
+        pre, post = rendered.split(self._SLOT)
+        self.tok = tok
+        self.pre_ids = tok.encode(pre, add_special_tokens=False)
+        self.post_ids = tok.encode(post, add_special_tokens=False)
+        self.max_post_len = max(
+            0, max_prompt_len - len(self.pre_ids) - len(self.post_ids)
+        )
+
+    def __call__(
+        self,
+        titles: List[str],
+        bodies: List[str],
+        comments: List[Optional[List[str]]],
+    ) -> List[List[int]]:
+        texts = [
+            prepare_for_input(title, body, cs or [])
+            for title, body, cs in zip(titles, bodies, comments)
+        ]
+        batch_ids = self.tok(texts, add_special_tokens=False)["input_ids"]
+        return [
+            self.pre_ids + ids[: self.max_post_len] + self.post_ids for ids in batch_ids
+        ]
+
+
+class PromptCache:
+    """Content-addressed on-disk store of a chunk's prompt token ids.
+
+    Entries are keyed by the chunk's post ids plus a fingerprint of the model
+    and the encoder's template and budget, so a resumed or re-leased shard
+    reuses prompts an earlier run already built, and a template or model
+    change never reads stale ids.
+    """
+
+    def __init__(self, root: str, encoder: PromptEncoder, model_id: str):
+        self.root = Path(root)
+        self._fingerprint = orjson.dumps(
+            [model_id, encoder.max_post_len, encoder.pre_ids, encoder.post_ids]
+        )
+
+    def _path(self, ids: List[str]) -> Path:
+        h = hashlib.blake2b(self._fingerprint, digest_size=16)
+        h.update("|".join(ids).encode())
+        key = h.hexdigest()
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, ids: List[str]) -> Optional[List[List[int]]]:
+        try:
+            return orjson.loads(self._path(ids).read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return None
+
+    def put(self, ids: List[str], prompt_ids: List[List[int]]) -> None:
+        path = self._path(ids)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so a crash never leaves a truncated entry behind
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(orjson.dumps(prompt_ids))
+        os.replace(tmp, path)
+
+
+SENTIMENT_KEYS = ("joy", "sadness", "anger", "fear", "love", "surprise")
+
+
 def parse_json(text: str) -> Optional[Dict[str, int]]:
-    t = text.strip()
-    t = re.sub(r"^```(?:json)?|```$", "", t, flags=re.MULTILINE | re.IGNORECASE).strip()
-    m = re.search(r"\{.*\}", t, re.DOTALL)
-    if not m:
+    # first "{" to last "}": same span the greedy r"\{.*\}" matched, and it
+    # already skips any ```json fences around the object
+    i = text.find("{")
+    j = text.rfind("}")
+    if i < 0 or j <= i:
         return None
     try:
-        obj = json.loads(m.group(0))
-        out = {}
-        for k in ["joy", "sadness", "anger", "fear", "love", "surprise"]:
-            v = int(obj.get(k, 1))
-            out[k] = max(1, min(10, v))
-        return out
+        obj = orjson.loads(text[i : j + 1])
+        return {k: max(1, min(10, int(obj.get(k, 1)))) for k in SENTIMENT_KEYS}
     except Exception:
         return None
 
 
+# The only output the annotator may produce: {"joy": N, "sadness": N, ...}, N in 1..10
+SCORE_REGEX = r"\{" + ", ".join(f'"{k}": ([1-9]|10)' for k in SENTIMENT_KEYS) + r"\}"
+
+
+class ScoreGrammar:
+    """Token-level automaton admitting only the score object (see SCORE_REGEX).
+
+    Every character of the output except the digits is fixed, so with this
+    grammar the model only chooses the scores: the rest is forced, parsing
+    cannot fail, and generation stops at the closing brace. Allowed-token
+    sets are computed once per automaton state and memoized.
+    """
+
+    def __init__(self, tok):
+        segments: list[Optional[str]] = []
+        for n, key in enumerate(SENTIMENT_KEYS):
+            # None marks a score slot between literals
+            segments += [("{" if n == 0 else ", ") + f'"{key}": ', None]
+        segments.append("}")
+        self._segments = segments
+        self._eos = [tok.eos_token_id]
+        alphabet = set("".join(s for s in segments if s)) | set("0123456789")
+        self._vocab = []
+        for i in range(len(tok)):
+            piece = tok.decode([i])
+            if piece and set(piece) <= alphabet:
+                self._vocab.append((i, piece))
+        self._allowed: dict[tuple[int, int], list[int]] = {}
+
+    def _step(self, state, ch: str):
+        seg, pos = state
+        if seg == len(self._segments):
+            return None
+        part = self._segments[seg]
+        if part is None:
+            # pos: 0 = no digit yet, 1 = saw "1" (may become 10), 2 = complete
+            if pos == 0:
+                return (seg, 1 if ch == "1" else 2) if ch in "123456789" else None
+            if pos == 1 and ch == "0":
+                return (seg, 2)
+            return self._step((seg + 1, 0), ch)
+        if part[pos] != ch:
+            return None
+        return (seg + 1, 0) if pos + 1 == len(part) else (seg, pos + 1)
+
+    def _walk(self, state, text: str):
+        for ch in text:
+            state = self._step(state, ch)
+            if state is None:
+                return None
+        return state
+
+    def allowed(self, generated: str) -> list[int]:
+        """Token ids that may follow ``generated``; only EOS once it is complete."""
+        state = self._walk((0, 0), generated)
+        if state is None or state[0] == len(self._segments):
+            return self._eos
+        if state not in self._allowed:
+            self._allowed[state] = [
+                i for i, piece in self._vocab if self._walk(state, piece) is not None
+            ] or self._eos
+        return self._allowed[state]
+
+
 def torch_bootstrap(seed: int = 42):
     torch.manual_seed(seed)
     if torch.cuda.is_available():
         torch.cuda.manual_seed_all(seed)
+        # Greedy decoding does not need deterministic kernels. benchmark stays
+        # off: batches are padded to their longest prompt, so nearly every
+        # shape is new and would trigger a fresh autotuning pass.
         torch.backends.cudnn.benchmark = False
-        torch.backends.cudnn.deterministic = True
-        torch.set_float32_matmul_precision("medium")
+        torch.backends.cudnn.deterministic = False
+        torch.set_float32_matmul_precision("high")
 
 
 def generate_with_adaptive_bs(
-    pipe, prompts: list[str], base_bs: int, max_new_tokens: int
-):
+    generate: HFGenerator, prompts: list[list[int]], base_bs: int, max_new_tokens: int
+) -> list[str]:
+    # Batch similar-length prompts together so little of each batch is padding.
+    # Longest first, so an OOM shows up (and shrinks bs) on the first batch.
+    order = sorted(range(len(prompts)), key=lambda k: len(prompts[k]), reverse=True)
     bs = base_bs
     i = 0
-    outputs = []
+    outputs: list[Optional[str]] = [None] * len(prompts)
     while i < len(prompts):
         take = min(bs, len(prompts) - i)
-        batch = prompts[i : i + take]
+        batch = [prompts[k] for k in order[i : i + take]]
         try:
-            with torch.inference_mode():
-                out = pipe(
-                    batch,
-                    max_new_tokens=max_new_tokens,
-                    do_sample=False,
-                    return_full_text=False,
-                )
-            outputs.extend(out)
+            texts = generate(batch, max_new_tokens=max_new_tokens)
+            for k, text in zip(order[i : i + take], texts):
+                outputs[k] = text
             i += take
             if bs < base_bs:
                 bs = min(base_bs, bs * 2)
@@ -141,14 +437,67 @@ def generate_with_adaptive_bs(
     return outputs
 
 
+def read_chunk(ds, lo: int, hi: int) -> Dict[str, List[Any]]:
+    """Read rows ``lo..hi`` (inclusive) as the columns prompts are built from.
+
+    ``ds`` must be in ``"arrow"`` format. Comment structs are reduced to their
+    ``body`` field inside Arrow, so no other column or comment field is ever
+    converted to Python objects.
+    """
+    tbl = ds[lo : hi + 1]
+    comments = tbl.column("comments").combine_chunks()
+    bodies = pa.ListArray.from_arrays(
+        comments.offsets, comments.values.field("body"), mask=comments.is_null()
+    )
+    return {
+        "id": tbl.column("id").to_pylist(),
+        "title": tbl.column("title").to_pylist(),
+        "text": tbl.column("text").to_pylist(),
+        "comments": bodies.to_pylist(),
+    }
+
+
+def prepare_chunk(
+    ds,
+    generator: HFGenerator | VllmGenerator,
+    lo: int,
+    hi: int,
+    cache: Optional[PromptCache] = None,
+) -> Dict[str, List[Any]]:
+    """Read a chunk and build its prompts; runs on the prefetch thread.
+
+    With a ``cache``, prompts tokenized by an earlier run are loaded instead
+    of rebuilt, and freshly built ones are stored for the next.
+    """
+    chunk = read_chunk(ds, lo, hi)
+    prompt_ids = cache.get(chunk["id"]) if cache is not None else None
+    if prompt_ids is not None:
+        metrics["prompt_cache_hits"] += 1
+    else:
+        prompt_ids = generator.encode_prompt(
+            chunk["title"], chunk["text"], chunk["comments"]
+        )
+        if cache is not None:
+            cache.put(chunk["id"], prompt_ids)
+    chunk["prompt_ids"] = prompt_ids
+    return chunk
+
+
 def annotate_batch(
-    settings: AnnoWorkerSettings, dataset: Dict[str, List[Any]], pipeline, batch_size
+    settings: AnnoWorkerSettings,
+    dataset: Dict[str, List[Any]],
+    generator: HFGenerator | VllmGenerator,
+    batch_size,
 ) -> List[Tuple[str, str]]:
     """Annotate a batch of Reddit post + comments.
 
     Args:
-        dataset (Dict[str, List[Any]]): A dict of columns from huggingface dataset
-        pipeline (_type_): The text generation pipeline to use for annotation.
+        dataset (Dict[str, List[Any]]): A dict of columns as returned by
+            :func:`read_chunk`; ``comments`` holds each post's comment bodies.
+            If :func:`prepare_chunk` already added ``prompt_ids``, they are
+            used as-is.
+        generator (HFGenerator | VllmGenerator): The generator returned by
+            :func:`load_pipeline`.
 
     Returns:
         List[Tuple[str, str]]: A list of tuples containing the post ID and the annotated JSON string.
@@ -157,19 +506,25 @@ def annotate_batch(
             ('1mp2r91','{"joy": 1, "sadness": 5, "anger": 10, "fear": 5, "love": 1, "surprise": 2}')
             ]
     """
-    prompts = []
     ids = dataset["id"]
-    for title, text, comments in zip(
-        dataset["title"], dataset["text"], dataset["comments"]
-    ):
-        comments = [comment["body"] for comment in comments]
-        prompts.append(build_prompt(title, text, comments))
-    outputs = generate_with_adaptive_bs(
-        pipeline, prompts, base_bs=batch_size, max_new_tokens=settings.MAX_NEW_TOKENS
-    )
-    # [[{'generated_text': '{"joy": 1, "sadness": 2, "anger": 5, "fear": 3, "love": 1, "surprise": 6}'}],
-    # [{'generated_text': '{"joy": 1, "sadness": 5, "anger": 10, "fear": 7, "love": 1, "surprise": 3}'}]]
-    outputs = [parse_json(o[0]["generated_text"]) for o in outputs]
+    if "prompt_ids" in dataset:
+        prompts = dataset["prompt_ids"]
+    else:
+        prompts = generator.encode_prompt(
+            dataset["title"], dataset["text"], dataset["comments"]
+        )
+    if isinstance(generator, VllmGenerator):
+        outputs = generator(prompts, max_new_tokens=settings.MAX_NEW_TOKENS)
+    else:
+        outputs = generate_with_adaptive_bs(
+            generator,
+            prompts,
+            base_bs=batch_size,
+            max_new_tokens=settings.MAX_NEW_TOKENS,
+        )
+    # ['{"joy": 1, "sadness": 2, "anger": 5, "fear": 3, "love": 1, "surprise": 6}',
+    #  '{"joy": 1, "sadness": 5, "anger": 10, "fear": 7, "love": 1, "surprise": 3}']
+    outputs = [parse_json(o) for o in outputs]
     metrics["json_parse_failures"] += sum(1 for o in outputs if o is None)
     out = list(zip(ids, outputs))
     return out
@@ -180,47 +535,39 @@ def lease_one(
     db: firestore.Client,
     tasks_ref: firestore.DocumentReference,
 ) -> Optional[str]:
-    now = datetime.now(timezone.utc)
     # Pull a small window to reduce conflicts
-    candidates = list(
+    candidates = (
         tasks_ref.where("status", "in", ["PENDING", "IN_PROGRESS"])
         .order_by("updated_at")
         .limit(25)
-        .stream()
     )
-    for snap in candidates:
-        d = snap.to_dict()
-        expired = (d.get("lease_expires_at") is None) or (d["lease_expires_at"] < now)
-        if d["status"] == "PENDING" or expired:
-
-            @firestore.transactional
-            def txn(tx):
-                s2 = snap.reference.get(transaction=tx)
-                d2 = s2.to_dict()
-                now2 = datetime.now(timezone.utc)
-                expired2 = (d2.get("lease_expires_at") is None) or (
-                    d2["lease_expires_at"] < now2
+
+    # Read the window and claim the first eligible task in one transaction,
+    # instead of one transaction (and round trip) per candidate.
+    @firestore.transactional
+    def txn(tx):
+        now = datetime.now(timezone.utc)
+        for snap in candidates.stream(transaction=tx):
+            d = snap.to_dict()
+            expired = (d.get("lease_expires_at") is None) or (
+                d["lease_expires_at"] < now
+            )
+            if d["status"] == "PENDING" or expired:
+                tx.update(
+                    snap.reference,
+                    {
+                        "status": "IN_PROGRESS",
+                        "lease_owner": settings.WORKER_ID,
+                        "lease_expires_at": now + timedelta(minutes=settings.LEASE_MIN),
+                        "updated_at": now,
+                        "attempts": d.get("attempts", 0)
+                        + (1 if d["status"] == "PENDING" else 0),
+                    },
                 )
-                if d2["status"] == "PENDING" or expired2:
-                    tx.update(
-                        snap.reference,
-                        {
-                            "status": "IN_PROGRESS",
-                            "lease_owner": settings.WORKER_ID,
-                            "lease_expires_at": now2
-                            + timedelta(minutes=settings.LEASE_MIN),
-                            "updated_at": now2,
-                            "attempts": d2.get("attempts", 0)
-                            + (1 if d2["status"] == "PENDING" else 0),
-                        },
-                    )
-                    return snap.reference.id
-                return None
+                return snap.reference.id
+        return None
 
-            res = txn(db.transaction())
-            if res:
-                return res
-    return None
+    return txn(db.transaction())
 
 
 def heartbeat(settings: AnnoWorkerSettings, tasks_ref, doc_id: str, inc_done: int = 0):
@@ -259,6 +606,33 @@ def _gcs_prefix(settings: AnnoWorkerSettings, shard_id: str) -> str:
     return f"{settings.GCS_PREFIX}/{settings.RUN_ID}/{shard_id}/{settings.WORKER_ID}"
 
 
+def _upload_chunk(
+    settings: AnnoWorkerSettings,
+    bucket: storage.Bucket,
+    tasks_ref,
+    shard_id: str,
+    blob_name: str,
+    payload: bytes,
+    n_records: int,
+):
+    blob = bucket.blob(blob_name)
+    try:
+        blob.upload_from_string(
+            payload, content_type="application/jsonl", if_generation_match=0
+        )
+        log.info(f"[worker] uploaded chunk to {blob_name}")
+    except google_exceptions.PreconditionFailed:
+        # uploaded by an earlier run that died before its heartbeat
+        log.warning(f"[worker] {blob_name} already exists; keeping it")
+    heartbeat(settings, tasks_ref, shard_id, inc_done=n_records)
+
+
+def _wait_uploads(pending: deque[Future], keep: int = 0):
+    """Block until at most ``keep`` uploads are in flight; re-raise failures."""
+    while len(pending) > keep:
+        pending.popleft().result()
+
+
 def main():
     torch_bootstrap()
     settings = get_settings()
@@ -271,10 +645,21 @@ def main():
     # load dataset
     ds = load_dataset(
         settings.SOURCE_HF_REPO, split="train", revision=run_config.get("revision")
-    )
+    ).with_format("arrow")
     pipe = load_pipeline(settings.ANN_MODEL_ID, settings)
+    prompt_cache = None
+    if settings.ANN_PROMPT_CACHE_DIR:
+        prompt_cache = PromptCache(
+            settings.ANN_PROMPT_CACHE_DIR, pipe.encode_prompt, settings.ANN_MODEL_ID
+        )
     gcs = storage.Client()
     bucket = gcs.bucket(settings.GCS_BUCKET)
+    # A single IO thread: uploads overlap inference but still finish in chunk
+    # order, so chunk_done only ever counts a contiguous prefix of the shard.
+    io_pool = ThreadPoolExecutor(max_workers=1)
+    pending: deque[Future] = deque()
+    # Reads and tokenizes the next chunk while the GPU works on the current one.
+    prefetch_pool = ThreadPoolExecutor(max_workers=1)
 
     while True:
         log.info("[worker] Initializing Firestore client")
@@ -290,11 +675,37 @@ def main():
         end_idx = shard["end_idx"]
 
         # process in chunks
-        for idx in range(start_idx + chunks_done, end_idx + 1, settings.CHUNK_SIZE):
-            hi = min(idx + settings.CHUNK_SIZE - 1, end_idx)
+        bounds = [
+            (idx, min(idx + settings.CHUNK_SIZE - 1, end_idx))
+            for idx in range(start_idx + chunks_done, end_idx + 1, settings.CHUNK_SIZE)
+        ]
+        next_chunk = None
+        if bounds:
+            next_chunk = prefetch_pool.submit(
+                prepare_chunk, ds, pipe, *bounds[0], prompt_cache
+            )
+        for n, (idx, hi) in enumerate(bounds):
             log.info(f"[worker] processing chunk {idx} to {hi}")
-            chunk = ds[idx : hi + 1]
-            log.info(f"[worker] chunk size: {len(chunk)}")
+            chunk = next_chunk.result()
+            if n + 1 < len(bounds):
+                next_chunk = prefetch_pool.submit(
+                    prepare_chunk, ds, pipe, *bounds[n + 1], prompt_cache
+                )
+            blob_name = (
+                f"{_gcs_prefix(settings, shard_id)}/chunk-{idx:07d}-{hi:07d}.jsonl"
+            )
+            if bucket.blob(blob_name).exists():
+                # a previous run uploaded this chunk but died before its
+                # heartbeat; count it instead of redoing the GPU work
+                log.info(f"[worker] {blob_name} already uploaded; skipping")
+                metrics["chunks_skipped"] += 1
+                pending.append(
+                    io_pool.submit(
+                        heartbeat, settings, tasks_ref, shard_id, hi - idx + 1
+                    )
+                )
+                continue
+            log.info(f"[worker] chunk size: {len(chunk['id'])}")
             out = annotate_batch(settings, chunk, pipe, settings.BATCH_SIZE)
             log.info(f"[worker] annotated {len(out)} items")
             records = []
@@ -309,24 +720,30 @@ def main():
                     }
                 )
             metrics["items_annotated"] += len(records)
-            payload = "\n".join(json.dumps(r, ensure_ascii=False) for r in records)
-
-            blob_name = (
-                f"{_gcs_prefix(settings, shard_id)}/chunk-{idx:07d}-{hi:07d}.jsonl"
-            )
-            blob = bucket.blob(blob_name)
-            blob.upload_from_string(
-                payload, content_type="application/jsonl", if_generation_match=0
+            payload = b"\n".join(orjson.dumps(r) for r in records)
+
+            _wait_uploads(pending, keep=MAX_PENDING_UPLOADS - 1)
+            pending.append(
+                io_pool.submit(
+                    _upload_chunk,
+                    settings,
+                    bucket,
+                    tasks_ref,
+                    shard_id,
+                    blob_name,
+                    payload,
+                    len(records),
+                )
             )
-            log.info(f"[worker] uploaded chunk to {blob_name}")
-            heartbeat(settings, tasks_ref, shard_id, inc_done=len(records))
+            # no gc.collect()/empty_cache() here: the caching allocator reuses
+            # these blocks for the next chunk; only the OOM path releases them
             del chunk, out, records, payload
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
+        _wait_uploads(pending)
         mark_completed(tasks_ref, shard_id)
         log.info(f"[worker] shard {shard_id} done")
         log.info(f"[worker] metrics: {dict(metrics)}")
+    io_pool.shutdown()
+    prefetch_pool.shutdown()
 
 
 if __name__ == "__main__":
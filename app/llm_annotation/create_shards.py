@@ -1,13 +1,39 @@
 # File: app/reddit/create_shards.py
 import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 from dotenv import load_dotenv
 from datasets import load_dataset
+from google.api_core.retry import Retry
 from google.cloud import firestore
 
 from app.utils.utils import getenv_int, getenv_str, get_dotenv_name
 
+# Firestore caps a write batch at 500 ops; stay well under it.
+BATCH_OPS = 400
+COMMIT_WORKERS = 16
+
+
+def commit_in_parallel(db: firestore.Client, writes: list[tuple]):
+    """Commit ``(docref, data)`` writes as independent batches on a thread pool.
+
+    Each slice of BATCH_OPS writes is its own batch, so the commits only
+    share the thread pool and run concurrently instead of one RTT at a time.
+    """
+    retry = Retry()
+
+    def commit_batch(chunk):
+        batch = db.batch()
+        for docref, data in chunk:
+            batch.set(docref, data, merge=False)
+        batch.commit(retry=retry)
+
+    slices = [writes[i : i + BATCH_OPS] for i in range(0, len(writes), BATCH_OPS)]
+    with ThreadPoolExecutor(max_workers=COMMIT_WORKERS) as ex:
+        # consume the iterator so a failed commit raises here
+        list(ex.map(commit_batch, slices))
+
 
 def main():
     load_dotenv(get_dotenv_name())
@@ -38,6 +64,8 @@ def main():
 
     db = firestore.Client(database=FIRESTORE_DATABASE_ID)
     run_doc = db.collection(FIRESTORE_ANNO_COLLECTION).document(RUN_ID)
+    # one timestamp for the run doc and every shard created with it
+    now = datetime.now(timezone.utc)
 
     run_doc.set(
         {
@@ -47,43 +75,38 @@ def main():
             "shard_size": SHARD_SIZE,
             "chunk_size": CHUNK_SIZE,
             "ann_model_id": ANN_MODEL_ID,
-            "created_at": datetime.now(timezone.utc),
+            "created_at": now,
         },
         merge=True,
     )
 
     tasks = run_doc.collection(FIRESTORE_ANNO_TASKS_SUBCOLLECTION)
 
-    batch = db.batch()
-
+    writes = []
     for i in range(shards):
         start = i * SHARD_SIZE
         end = min((i + 1) * SHARD_SIZE, n) - 1
         chunk_total = math.ceil((end - start + 1) / CHUNK_SIZE)
 
         doc_id = f"shard-{i + 1:06d}"
-        docref = tasks.document(doc_id)
-        batch.set(
-            docref,
-            {
-                "status": "PENDING",
-                "start_idx": start,
-                "end_idx": end,
-                "chunk_total": chunk_total,
-                "chunk_done": 0,
-                "lease_owner": None,
-                "lease_expires_at": None,
-                "attempts": 0,
-                "updated_at": datetime.now(timezone.utc),
-            },
-            merge=False,
+        writes.append(
+            (
+                tasks.document(doc_id),
+                {
+                    "status": "PENDING",
+                    "start_idx": start,
+                    "end_idx": end,
+                    "chunk_total": chunk_total,
+                    "chunk_done": 0,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "attempts": 0,
+                    "updated_at": now,
+                },
+            )
         )
 
-        if i % 400 == 0:
-            batch.commit()
-            batch = db.batch()
-
-    batch.commit()
+    commit_in_parallel(db, writes)
     print("shards created.")
 
 
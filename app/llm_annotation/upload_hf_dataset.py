@@ -3,30 +3,55 @@
 Downloads Reddit post archives from GCS in parallel, builds a HF Dataset,
 pushes it to the Hub, and (optionally) deletes the source blobs after success.
 
-- Multithreaded downloads using ThreadPoolExecutor
+- Parallel downloads using ThreadPoolExecutor or ProcessPoolExecutor
 - Tunable chunk size and worker count (env-based)
-- Robust JSON loading and DataFrame prep
+- Robust JSON loading and Arrow table prep
 """
 
-import json
 import os
 import time
 import tempfile
 from pathlib import Path
 from typing import Iterable, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-import pandas as pd
+import ijson
+import orjson
+import pyarrow as pa
 from dotenv import load_dotenv
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 from datasets import Dataset
 
 from app.utils.utils import getenv_bool, getenv_int, getenv_str
 
+# Archives above this size are stream-parsed with ijson.
+STREAM_PARSE_MIN_BYTES = 64 * 1024 * 1024
+
+# GCS accepts at most 100 calls in one batch request.
+DELETE_BATCH_SIZE = 100
+
+# Explicit Arrow types for well-known post fields (absent keys become nulls).
+KNOWN_COLUMN_TYPES = {
+    "id": pa.string(),
+    "score": pa.int32(),
+    "num_comments": pa.int32(),
+    "created_utc": pa.int64(),
+}
+
 
 # ---------------------------
-# Multithreaded download
+# Parallel download
 # ---------------------------
+# Per-process client for ProcessPoolExecutor workers, set by the initializer.
+_worker_client: storage.Client | None = None
+
+
+def _init_download_worker() -> None:
+    global _worker_client
+    _worker_client = storage.Client()
+
+
 def _download_one(
     blob: storage.Blob,
     base_dir: Path,
@@ -39,33 +64,57 @@ def _download_one(
     Returns (blob_name, local_path or None, bytes_written, error or None)
     """
     try:
-        if chunk_size_bytes:
-            # Larger chunks reduce per-request overhead for large objects.
-            # Must be a multiple of 256 KB. 8 MB is a good general default.
-            blob.chunk_size = chunk_size_bytes
-
         name = Path(blob.name)
         if add_json_suffix and name.suffix.lower() != ".json":
             name = name.with_name(name.name + ".json")
 
         local_path = base_dir / name
         local_path.parent.mkdir(parents=True, exist_ok=True)
-        blob.download_to_filename(local_path)
+        try:
+            # One GET per object instead of a series of ranged chunk requests.
+            blob.download_to_filename(local_path, single_shot_download=True)
+        except TypeError:
+            # Older google-cloud-storage without single_shot_download.
+            if chunk_size_bytes:
+                # Larger chunks reduce per-request overhead for large objects.
+                # Must be a multiple of 256 KB. 8 MB is a good general default.
+                blob.chunk_size = chunk_size_bytes
+            blob.download_to_filename(local_path)
         return blob.name, local_path, local_path.stat().st_size, None
     except Exception as e:
         return blob.name, None, 0, e
 
 
+def _download_one_by_name(
+    bucket_name: str,
+    blob_name: str,
+    base_dir: Path,
+    add_json_suffix: bool,
+    chunk_size_bytes: int | None,
+) -> Tuple[str, Path | None, int, Exception | None]:
+    """
+    Process-pool worker: rebuild the blob from picklable names and download it
+    with this process's client.
+    """
+    blob = _worker_client.bucket(bucket_name).blob(blob_name)
+    return _download_one(blob, base_dir, add_json_suffix, chunk_size_bytes)
+
+
 def parallel_download(
     blobs: Iterable[storage.Blob],
     base_dir: Path,
     max_workers: int = 16,
     chunk_size_mb: int | None = 8,
     add_json_suffix: bool = True,
+    use_processes: bool = False,
 ) -> Tuple[List[Path], int, List[Tuple[str, str]]]:
     """
     Download many blobs concurrently.
 
+    With use_processes, each worker is a separate process with its own
+    storage client, which avoids GIL and connection-pool contention in the
+    client once the worker count grows past ~10 threads.
+
     Returns:
         files: list of local Paths
         total_bytes: sum of bytes written
@@ -76,11 +125,31 @@ def parallel_download(
     total_bytes = 0
     errors: List[Tuple[str, str]] = []
 
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = [
-            ex.submit(_download_one, b, base_dir, add_json_suffix, chunk_size_bytes)
-            for b in blobs
-        ]
+    if use_processes:
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_download_worker
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    with pool as ex:
+        if use_processes:
+            futures = [
+                ex.submit(
+                    _download_one_by_name,
+                    b.bucket.name,
+                    b.name,
+                    base_dir,
+                    add_json_suffix,
+                    chunk_size_bytes,
+                )
+                for b in blobs
+            ]
+        else:
+            futures = [
+                ex.submit(_download_one, b, base_dir, add_json_suffix, chunk_size_bytes)
+                for b in blobs
+            ]
         for fut in as_completed(futures):
             name, path, size, err = fut.result()
             if err:
@@ -92,9 +161,56 @@ def parallel_download(
     return files, total_bytes, errors
 
 
+# ---------------------------
+# Batched delete
+# ---------------------------
+def _delete_batch(
+    client: storage.Client, blobs: List[storage.Blob]
+) -> List[Tuple[str, str]]:
+    """
+    Delete blobs in one multipart batch request.
+
+    If the batch reports a failure, the blobs are retried one by one so the
+    errors can be attributed (NotFound then means the batch already deleted it).
+
+    Returns a list of (blob_name, error_repr) for blobs that could not be deleted.
+    """
+    try:
+        with client.batch():
+            for b in blobs:
+                b.delete()
+        return []
+    except Exception:
+        errors: List[Tuple[str, str]] = []
+        for b in blobs:
+            try:
+                b.delete()
+            except NotFound:
+                pass
+            except Exception as e:
+                errors.append((b.name, repr(e)))
+        return errors
+
+
 # ---------------------------
 # JSON loading
 # ---------------------------
+def _stream_wrapped_records(fp: Path) -> list | None:
+    """
+    Parse the items of a {"data": [...]} archive incrementally from the file,
+    so the raw file bytes are never read into memory in one piece (the
+    records themselves are still collected into a list). Returns None when
+    the file is not in that shape (or the list is empty), so the caller can
+    fall back to a full parse.
+    """
+    with open(fp, "rb") as f:
+        if not f.read(64).lstrip().startswith(b"{"):
+            return None
+        f.seek(0)
+        records = list(ijson.items(f, "data.item", use_float=True))
+    return records or None
+
+
 def load_post_records(files: List[Path]) -> list:
     """
     Load JSON files. Accepts either a list of records or a single dict record.
@@ -103,8 +219,13 @@ def load_post_records(files: List[Path]) -> list:
     records: list = []
     for fp in files:
         try:
-            with open(fp, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            if fp.stat().st_size >= STREAM_PARSE_MIN_BYTES:
+                streamed = _stream_wrapped_records(fp)
+                if streamed is not None:
+                    records.extend(streamed)
+                    continue
+            with open(fp, "rb") as f:
+                data = orjson.loads(f.read())
             if isinstance(data, list):
                 records.extend(data)
             elif isinstance(data, dict):
@@ -119,6 +240,49 @@ def load_post_records(files: List[Path]) -> list:
     return records
 
 
+def posts_to_table(posts: List[dict]) -> pa.Table:
+    """
+    Build an Arrow table column by column from heterogeneous post dicts.
+
+    Columns follow first-seen key order; missing keys become nulls. Known
+    fields are cast to their explicit type (a safe cast, so e.g. a fractional
+    score keeps the inferred type instead of being truncated).
+    """
+    keys = dict.fromkeys(k for p in posts for k in p)
+    cols = {}
+    for key in keys:
+        arr = pa.array([p.get(key) for p in posts])
+        typ = KNOWN_COLUMN_TYPES.get(key)
+        if typ is not None and arr.type != typ:
+            try:
+                arr = arr.cast(typ)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                pass
+        cols[key] = arr
+    return pa.table(cols)
+
+
+def most_commented_first_unique(posts: List[dict]) -> List[dict]:
+    """
+    Order posts by comment count (descending) and keep the first post per id,
+    i.e. the most-commented copy of each post. Posts without an id count as
+    one shared id, as pandas' drop_duplicates would treat them.
+    """
+    n_comments = [
+        len(c) if isinstance(c, (list, tuple)) else 0
+        for c in (p.get("comments") for p in posts)
+    ]
+    order = sorted(range(len(posts)), key=n_comments.__getitem__, reverse=True)
+    seen = set()
+    unique = []
+    for i in order:
+        pid = posts[i].get("id")
+        if pid not in seen:
+            seen.add(pid)
+            unique.append(posts[i])
+    return unique
+
+
 # ---------------------------
 # Main
 # ---------------------------
@@ -146,10 +310,14 @@ def main() -> int:
     delete_after_upload = getenv_bool("DELETE_AFTER_UPLOAD", False)
 
     # Download tuning
-    max_workers = getenv_int("DL_MAX_WORKERS", 16)
+    max_workers = getenv_int("DL_MAX_WORKERS", 32)
+    use_processes = getenv_bool("DL_USE_PROCESSES", False)
     chunk_size_mb = getenv_int("DL_CHUNK_MB", 8)
     tmp_dir = getenv_str("TMPDIR", "/tmp")
 
+    # Upload tuning: smaller parquet shards are built and uploaded in parallel
+    max_shard_size = getenv_str("HF_MAX_SHARD_SIZE", "100MB")
+
     storage_client = storage.Client()
 
     # List blobs (optionally by prefix)
@@ -166,7 +334,7 @@ def main() -> int:
         tempdir = Path(tempdirname)
         print(f"Temp dir: {tempdir}")
 
-        # ---- Multithreaded download ----
+        # ---- Parallel download ----
         t0 = time.time()
         files, total_bytes, errors = parallel_download(
             blobs=blobs,
@@ -174,6 +342,7 @@ def main() -> int:
             max_workers=max_workers,
             chunk_size_mb=chunk_size_mb,
             add_json_suffix=True,
+            use_processes=use_processes,
         )
         elapsed = time.time() - t0
         mib_s = (total_bytes / (1024 * 1024)) / elapsed if elapsed > 0 else 0.0
@@ -212,57 +381,48 @@ def main() -> int:
             print("No valid post dicts; aborting push.")
             return 1
 
-        df = pd.DataFrame(clean_posts)
-
         # Basic metrics
-        if "id" in df.columns:
-            print(f"Rows: {len(df)}, Unique posts by id: {df['id'].nunique()}")
+        has_id = any("id" in p for p in clean_posts)
+        if has_id:
+            unique_ids = {p.get("id") for p in clean_posts} - {None}
+            print(f"Rows: {len(clean_posts)}, Unique posts by id: {len(unique_ids)}")
         else:
             print("Warning: no 'id' column found; pushing without dedup by id.")
 
-        if "comments" in df.columns:
-            df = df.sort_values(
-                "comments",
-                key=lambda s: s.apply(
-                    lambda v: len(v) if isinstance(v, (list, tuple)) else 0
-                ),
-                ascending=False,
-            )
-
-        if "id" in df.columns:
-            before = len(df)
-            df = df.drop_duplicates(subset="id", keep="first")
-            print(f"Deduplicated by id: {before} → {len(df)}")
+        # Keep the most-commented copy of each post (sorted on the dicts,
+        # before any columnar conversion, so dropped rows are never built)
+        before = len(clean_posts)
+        if has_id:
+            clean_posts = most_commented_first_unique(clean_posts)
+            print(f"Deduplicated by id: {before} → {len(clean_posts)}")
 
-        dataset = Dataset.from_pandas(df, preserve_index=False)
+        dataset = Dataset(posts_to_table(clean_posts))
 
         try:
             commit_info = dataset.push_to_hub(
                 "Nech-C/reddit-sentiment",
                 private=False,
                 token=hf_token,
+                max_shard_size=max_shard_size,
             )
             print(
                 f"Pushed successfully: {commit_info.commit_url} (oid={commit_info.oid})"
             )
 
             if delete_after_upload:
-                # Optional: parallelize deletions, too (they’re fast, but why not)
+                # Batched deletes (100 per request), a few batches in flight
                 del_errors: List[Tuple[str, str]] = []
-
-                def _delete_one(b: storage.Blob) -> Tuple[str, Exception | None]:
-                    try:
-                        b.delete()
-                        return b.name, None
-                    except Exception as e:
-                        return b.name, e
-
-                with ThreadPoolExecutor(max_workers=min(32, len(blobs) or 1)) as ex:
-                    futures = [ex.submit(_delete_one, b) for b in blobs]
+                batches = [
+                    blobs[i : i + DELETE_BATCH_SIZE]
+                    for i in range(0, len(blobs), DELETE_BATCH_SIZE)
+                ]
+                with ThreadPoolExecutor(max_workers=min(8, len(batches) or 1)) as ex:
+                    futures = [
+                        ex.submit(_delete_batch, storage_client, batch)
+                        for batch in batches
+                    ]
                     for fut in as_completed(futures):
-                        name, err = fut.result()
-                        if err:
-                            del_errors.append((name, repr(err)))
+                        del_errors.extend(fut.result())
 
                 print(
                     f"Deleted {len(blobs) - len(del_errors)}/{len(blobs)} blobs from {bucket_name}"
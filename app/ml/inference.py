@@ -2,39 +2,75 @@
 import os
 from functools import lru_cache
 
-from transformers import pipeline
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 from app.config import get_inference_settings
 
 settings = get_inference_settings()
 
 
+def configure_torch_threads() -> None:
+    """Size PyTorch's CPU thread pools instead of trusting container defaults."""
+    torch.set_num_threads(settings.INFER_INTRA_THREADS or os.cpu_count() or 1)
+    try:
+        torch.set_num_interop_threads(settings.INFER_INTEROP_THREADS)
+    except RuntimeError:
+        # only settable before the first inter-op parallel work in the process
+        pass
+
+
 @lru_cache()
 def get_classifier():
-    """Get sentiment analysis pipeine with caching.
+    """Get the sentiment tokenizer and model with caching.
 
     Returns:
-        Pipeline: a text-classification pipeline for sentiment analysis.
+        tuple: (tokenizer, model) with the model in eval mode.
     """
-    return pipeline(
-        "text-classification",
-        model=settings.SENTIMENT_MODEL_ID,
-        truncation=True,
-        top_k=None,
+    configure_torch_threads()
+    tokenizer = AutoTokenizer.from_pretrained(settings.SENTIMENT_MODEL_ID)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        settings.SENTIMENT_MODEL_ID
     )
+    return tokenizer, model.eval()
 
 
-def run_batch_inference(texts: list[str], batch_size: int = 32) -> list[dict]:
-    all_results = []
+def warm_up() -> None:
+    """Load the tokenizer and model ahead of the first batch."""
+    get_classifier()
+
+
+def run_batch_inference_matrix(
+    texts: list[str], batch_size: int = 32
+) -> tuple[list[str], np.ndarray]:
+    """Classify texts into one probability row per text.
+
+    Returns:
+        tuple: (labels, probs) where ``probs`` has shape (len(texts), len(labels))
+        and column ``j`` holds the probability of ``labels[j]``.
+    """
+    tokenizer, model = get_classifier()
+    labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+    probs = np.empty((len(texts), len(labels)), dtype=np.float32)
     for i in range(0, len(texts), batch_size):
         batch = texts[i : i + batch_size]
         if os.getenv("APP_ENV") == "test":
             print(f"batch: {batch}")
-        truncated = [
-            text[: settings.BATCH_MAX_TOKENS] for text in batch
-        ]  # change BATCH_MAX_TOKEN
-        results = get_classifier()(truncated)
+        # truncate by tokens, not characters: a character cut keeps ~1/4 of the context
+        enc = tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=settings.BATCH_MAX_TOKENS,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            probs[i : i + len(batch)] = model(**enc).logits.softmax(-1).numpy()
 
-        all_results.extend([{res["label"]: res["score"] for res in r} for r in results])
+    return labels, probs
 
-    return all_results
+
+def run_batch_inference(texts: list[str], batch_size: int = 32) -> list[dict]:
+    labels, probs = run_batch_inference_matrix(texts, batch_size)
+    return [dict(zip(labels, row)) for row in probs.tolist()]
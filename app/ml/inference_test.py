@@ -1,7 +1,10 @@
 # File: app/ml/inference.py
+from functools import lru_cache
+
 from transformers import pipeline
 from memory_profiler import profile
 
+@lru_cache(maxsize=1)
 def build_classifier():
     return pipeline(
         "text-classification",
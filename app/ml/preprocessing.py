@@ -5,6 +5,29 @@ import unicodedata
 
 from typing import List
 
+_RE_BLOCKQUOTE = re.compile(r"(?m)^>+\s*")
+_RE_MDLINK = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+_RE_URL = re.compile(r"https?://\S+")
+# blockquote markers, markdown links and bare URLs in one scan (see clean_text)
+_RE_QUOTE_LINK_URL = re.compile(
+    "|".join(p.pattern for p in (_RE_BLOCKQUOTE, _RE_MDLINK, _RE_URL))
+)
+
+
+# blockquote markers on the later lines of a multi-line link anchor
+_RE_ANCHOR_QUOTE = re.compile(r"(?<=\n)>+\s*")
+
+# str.translate table deleting ASCII control characters
+_CTRL_TABLE = dict.fromkeys([*range(0x20), 0x7F])
+
+
+def _unwrap_link(m: re.Match) -> str:
+    anchor = m.group(1)
+    if not anchor:
+        return ""  # blockquote marker or bare URL
+    # what the separate passes would have removed from inside the anchor
+    return _RE_URL.sub("", _RE_ANCHOR_QUOTE.sub("", anchor))
+
 
 def normalize_unicode(text: str) -> str:
     """Normalize unicode using NFKC form."""
@@ -13,22 +36,23 @@ def normalize_unicode(text: str) -> str:
 
 def collapse_whitespace(text: str) -> str:
     """Collapse runs of whitespace into a single space."""
-    return re.sub(r"\s+", " ", text).strip()
+    # str.split() splits on the same characters as \s and drops the ends
+    return " ".join(text.split())
 
 
 def strip_blockquotes(text: str) -> str:
     """Remove Reddit-style blockquote lines starting with >"""
-    return re.sub(r"(?m)^>+\s*", "", text)
+    return _RE_BLOCKQUOTE.sub("", text)
 
 
 def remove_markdown_links(text: str) -> str:
     """Remove [anchor](url) markdown links, keep just anchor text."""
-    return re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    return _RE_MDLINK.sub(r"\1", text)
 
 
 def drop_bare_urls(text: str) -> str:
     """Remove plain URLs (e.g. https://example.com)."""
-    return re.sub(r"https?://\S+", "", text)
+    return _RE_URL.sub("", text)
 
 
 def decode_html_entities(text: str) -> str:
@@ -43,7 +67,7 @@ def strip_nonbreaking_spaces(text: str) -> str:
 
 def remove_control_chars(text: str) -> str:
     """Remove emoji and control characters (non-ASCII)."""
-    text = re.sub(r"[\x00-\x1f\x7f]", "", text)
+    text = text.translate(_CTRL_TABLE)
     return text.encode("ascii", "ignore").decode()
 
 
@@ -66,12 +90,16 @@ def clean_text(
         text = strip_nonbreaking_spaces(text)
     if decode_entities:
         text = decode_html_entities(text)
-    if strip_quotes:
-        text = strip_blockquotes(text)
-    if remove_md_links:
-        text = remove_markdown_links(text)
-    if remove_urls:
-        text = drop_bare_urls(text)
+    if strip_quotes and remove_md_links and remove_urls:
+        # the default path: one fused scan instead of three
+        text = _RE_QUOTE_LINK_URL.sub(_unwrap_link, text)
+    else:
+        if strip_quotes:
+            text = strip_blockquotes(text)
+        if remove_md_links:
+            text = remove_markdown_links(text)
+        if remove_urls:
+            text = drop_bare_urls(text)
     if strip_controls:
         text = remove_control_chars(text)
     if collapse_ws:
@@ -3,7 +3,6 @@
 
 from typing import Optional, List, Annotated, Any, Union
 from datetime import datetime
-import math
 
 from pydantic import (
     BaseModel,
@@ -45,18 +44,21 @@ class Sentiment(BaseModel):
     # run after field-level validation on the instance
     @model_validator(mode="after")
     def _normalize_if_needed(self) -> "Sentiment":
-        vals = [self.joy, self.sadness, self.anger, self.fear, self.love, self.surprise]
-        total = sum(vals)
-        # nothing predicted
-        if total == 0 or math.isclose(total, 1.0, rel_tol=1e-6, abs_tol=1e-9):
+        # runs once per post: no list, no isclose() call, one division
+        total = (
+            self.joy + self.sadness + self.anger + self.fear + self.love + self.surprise
+        )
+        # nothing predicted, or already a distribution
+        if total == 0 or abs(total - 1.0) <= 1e-6:
             return self
         # normalize in-place and return instance
-        self.joy /= total
-        self.sadness /= total
-        self.anger /= total
-        self.fear /= total
-        self.love /= total
-        self.surprise /= total
+        inv = 1.0 / total
+        self.joy *= inv
+        self.sadness *= inv
+        self.anger *= inv
+        self.fear *= inv
+        self.love *= inv
+        self.surprise *= inv
         return self
 
 
@@ -99,25 +101,15 @@ class Post(BaseModel):
     def _apply_legacy_keys(cls, data: Any):
         """Support legacy dictionary keys from the previous implementation."""
 
-        if isinstance(data, dict):
-            data = data.copy()
-            if "created_utc" in data and "created" not in data:
-                data["created"] = data["created_utc"]
+        # copy only when a key is actually added; the caller's dict stays untouched
+        if isinstance(data, dict) and "created_utc" in data and "created" not in data:
+            data = {**data, "created": data["created_utc"]}
         return data
 
-    @field_validator("post_created_ts", mode="before")
+    @field_validator("post_created_ts", "processing_timestamp", mode="before")
     @classmethod
-    def _coerce_created_ts(cls, v: Any):
-        if v is None:
-            return None
-        if isinstance(v, (int, float)):
-            return datetime.fromtimestamp(v, tz=constants.TIMEZONE)
-        return v
-
-    @field_validator("processing_timestamp", mode="before")
-    @classmethod
-    def _coerce_processing_ts(cls, v: Any):
-        # If caller omitted the field, Pydantic will call the default_factory and v will be a datetime,
+    def _coerce_epoch_ts(cls, v: Any):
+        # If caller omitted processing_timestamp, Pydantic will call the default_factory and v will be a datetime,
         # or in some cases the validator may not be called — but we only need to handle numeric inputs here.
         if v is None:
             return None
@@ -153,17 +145,15 @@ class Post(BaseModel):
         - Adds post_text_preview (truncated).
         - Omits None fields for cleaner insert payloads.
         """
-        dump = self.model_dump(mode="json", exclude_none=True)
+        # Full text is never serialized: it is not uploaded to BigQuery
+        dump = self.model_dump(mode="json", exclude_none=True, exclude={"post_text"})
 
-        full_text = dump.get("post_text")
+        full_text = self.post_text
         if full_text:
             dump["post_text_preview"] = full_text[:preview_length_limit]
         else:
             dump["post_text_preview"] = None
 
-        # Remove full text to avoid uploading big blobs to BigQuery
-        dump.pop("post_text", None)
-
         return dump
 
 
@@ -1,100 +1,149 @@
 # File: app/processing/aggregate.py
 """Aggregation helpers for computing sentiment summaries from Reddit posts."""
 
-from collections import defaultdict
-import heapq
+from operator import attrgetter
 from typing import Iterable
 
 import numpy as np
 
-from app.models.post import Post, SentimentSummary
+from app.models.post import (
+    Post,
+    PostComment,
+    Sentiment,
+    SentimentSummary,
+    TopSentimentContributor,
+)
 
+EMOTIONS = tuple(Sentiment.model_fields)
+_emotion_values = attrgetter(*EMOTIONS)
+TOP_CONTRIBUTORS_PER_EMOTION = 3
 
-def normalized_softmax(x: np.ndarray, temperature: int) -> np.ndarray:
-    x = np.log1p(x)
-    x /= temperature
-    e_x = np.exp(x - np.max(x))
-    return e_x / e_x.sum()
 
+def normalized_softmax(x: np.ndarray, temperature: float) -> np.ndarray:
+    # log1p allocates the one output buffer; every later step works in place
+    y = np.log1p(x, dtype=np.float64)
+    y /= temperature
+    y -= y.max()
+    np.exp(y, out=y)
+    y /= y.sum()
+    return y
 
-def _ensure_post(post_data: Post | dict) -> Post:
-    """Coerce dictionaries into :class:`Post` models for uniform handling."""
 
-    if isinstance(post_data, Post):
-        return post_data
-    return Post.model_validate(post_data)
+def _top_k_desc(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest values, largest first; ties go to the later index.
+
+    An O(n) partition finds the k-th largest value; only the candidates at or
+    above it (k plus any ties) are sorted.
+    """
+    if len(values) > k:
+        cutoff = np.partition(values, -k)[-k]
+        candidates = np.flatnonzero(values >= cutoff)
+    else:
+        candidates = np.arange(len(values))
+    ranked = candidates[np.lexsort((candidates, values[candidates]))]
+    return ranked[::-1][:k]
 
 
-def compute_sentiment_average(posts: Iterable[Post | dict]) -> SentimentSummary:
+def _ensure_post(post_data: Post | dict, trusted: bool = False) -> Post:
+    """Coerce dictionaries into :class:`Post` models for uniform handling.
+
+    ``trusted`` dictionaries (field-named output of an already validated
+    :class:`Post`, e.g. ``to_python_dict()``) are assembled with
+    ``model_construct`` instead of being validated again.
+    """
+
+    if isinstance(post_data, Post):
+        return post_data
+    if not trusted:
+        return Post.model_validate(post_data)
+    data = dict(post_data)
+    if isinstance(data.get("sentiment"), dict):
+        data["sentiment"] = Sentiment.model_construct(**data["sentiment"])
+    if "post_comments" in data:
+        data["post_comments"] = [
+            PostComment.model_construct(**c) if isinstance(c, dict) else c
+            for c in data["post_comments"]
+        ]
+    return Post.model_construct(**data)
+
+
+def compute_sentiment_average(
+    posts: Iterable[Post | dict],
+    trusted: bool = False,
+    sentiment_matrix: np.ndarray | None = None,
+) -> SentimentSummary:
     """
     Aggregates sentiment scores across all posts.
 
     Args:
         posts (Iterable[Post | dict]): Reddit posts (models or dictionaries) with
             sentiment predictions attached.
+        trusted (bool): Skip re-validating dictionaries that came from
+            already validated posts in this process.
+        sentiment_matrix (np.ndarray | None): Optional (posts x EMOTIONS)
+            scores, one row per input post in order. When given, the numeric
+            work reads this matrix instead of each post's ``sentiment``.
 
     Returns:
         dict: Averaged sentiment values.
     """
-    validated_posts = [_ensure_post(p) for p in posts]
-    valid_posts = [
-        p
-        for p in validated_posts
-        if p.sentiment is not None and p.post_score is not None
-    ]
-    if not valid_posts:
+    # One pass: keep scored posts with a sentiment, alongside their score and
+    # emotion row, so nothing is re-filtered or looked up again later.
+    contributors: list[Post] = []
+    scores: list[int] = []
+    kept: list[int] = []  # input positions, i.e. sentiment_matrix rows
+    rows: list[tuple[float, ...]] = []
+    for i, post in enumerate(posts):
+        post = _ensure_post(post, trusted)
+        score = post.post_score
+        if score is None or score <= 0:
+            continue
+        if sentiment_matrix is None:
+            if post.sentiment is None:
+                continue
+            rows.append(_emotion_values(post.sentiment))
+        contributors.append(post)
+        scores.append(score)
+        kept.append(i)
+    if not contributors:
         return {}
 
     # softmax
     temperature = 1.5  # Try tuning between 100–5000
+    weights = normalized_softmax(np.array(scores, dtype=np.float64), temperature)
 
-    filtered = [
-        (i, max(p.post_score or 0, 0))
-        for i, p in enumerate(valid_posts)
-        if (p.post_score or 0) > 0
-    ]
-    if not filtered:
-        return {}
-
-    indices, scores = zip(*filtered)
-    scores = np.array(scores)
-    weights = normalized_softmax(scores, temperature)
-
-    weighted_totals = defaultdict(float)
-    top_contributors = defaultdict(list)
-
-    for i, w in zip(indices, weights):
-        post = valid_posts[i]
-        sentiment = post.sentiment.model_dump(mode="python") if post.sentiment else {}
-        for k, v in sentiment.items():
-            contribution = v * w
-            weighted_totals[k] += contribution
-
-            heapq.heappush(top_contributors[k], (contribution, i, post))
-
-            if len(top_contributors[k]) > 3:
-                heapq.heappop(top_contributors[k])
+    # (posts x emotions) matrix
+    if sentiment_matrix is not None:
+        sentiments = sentiment_matrix[kept].astype(np.float64)
+    else:
+        sentiments = np.array(rows, dtype=np.float64)
+    weighted_totals = weights @ sentiments
 
-    total = sum(weighted_totals.values())
+    total = weighted_totals.sum()
     if total == 0:
-        return {label: 0 for label in weighted_totals}
-
-    averages = {label: val / total for label, val in weighted_totals.items()}
-    return SentimentSummary.model_validate(
-        {
-            **averages,
-            "top_contributors": [
-                {
-                    "emotion": emotion,
-                    "top_posts": [
-                        {
-                            **post.to_python_dict(),
-                            "contribution": contrib,
-                        }
-                        for contrib, _, post in sorted(entries, reverse=True)
-                    ],
-                }
-                for emotion, entries in top_contributors.items()
-            ],
-        }
+        return {label: 0 for label in EMOTIONS}
+
+    contributions = sentiments * weights[:, None]
+
+    # Posts are only looked up for the (at most 3 per emotion) winners.
+    # Everything below is built from already validated posts, so the summary
+    # is assembled with model_construct instead of a second validation pass.
+    top_contributors = []
+    for k, emotion in enumerate(EMOTIONS):
+        column = contributions[:, k]
+        top_contributors.append(
+            TopSentimentContributor.model_construct(
+                emotion=emotion,
+                top_posts=[
+                    contributors[j].model_copy(
+                        update={"contribution": float(column[j])}
+                    )
+                    for j in _top_k_desc(column, TOP_CONTRIBUTORS_PER_EMOTION)
+                ],
+            )
+        )
+
+    averages = dict(zip(EMOTIONS, (weighted_totals / total).tolist()))
+    return SentimentSummary.model_construct(
+        **averages, top_contributors=top_contributors
     )
@@ -6,22 +6,29 @@ from __future__ import annotations
 import json
 import logging
 import os
+import queue
+import threading
 import time
-
-from collections.abc import Iterable, Mapping
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import lru_cache
 from pathlib import Path
 
 import praw
+from praw.models import MoreComments
 
 from app import constants
-from app.config import RedditSettings, get_reddit_settings, get_app_settings
+from app.config import RedditSettings, get_app_settings, get_reddit_settings
 from app.models.post import Post, PostComment
 
-
 log = logging.getLogger("reddit.fetch")
 
+LISTING_METHODS = frozenset({"hot", "new", "top"})
+# Bot accounts whose comments carry no sentiment signal.
+SKIP_AUTHORS = frozenset({"AutoModerator", "RemindMeBot", "WikiTextBot"})
+
 app_settings = get_app_settings()
 if app_settings.GOOGLE_APPLICATION_CREDENTIALS:
     # only set if not already set (idempotent)
@@ -30,6 +37,23 @@ if app_settings.GOOGLE_APPLICATION_CREDENTIALS:
     )
 
 
+class _RequestSpacer:
+    """Hand out slots at least ``interval`` seconds apart across threads."""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class RedditFetcher:
     """Encapsulates the logic for fetching and preparing Reddit posts."""
 
@@ -39,6 +63,7 @@ class RedditFetcher:
         reddit_client: praw.Reddit | None = None,
         *,
         subreddit_config_path: str | None = None,
+        reddit_client_factory: Callable[[], praw.Reddit] | None = None,
     ) -> None:
         """Create a new :class:`RedditFetcher`.
 
@@ -49,16 +74,32 @@ class RedditFetcher:
                 client is created from ``settings``.
             subreddit_config_path: Optional override for the default JSON file
                 containing subreddit categories.
+            reddit_client_factory: Builds extra clients for concurrent
+                fetches. Defaults to :meth:`_build_reddit_client` when no
+                ``reddit_client`` is given; with an injected client and no
+                factory, fetches run one at a time on that client.
         """
 
         self.settings = settings or get_reddit_settings()
-        self._reddit = reddit_client or self._build_reddit_client()
+        # Only listing starts are spaced; the requests inside a listing are
+        # paced by each client's own header-based rate limiter.
+        self._listing_spacer = _RequestSpacer(
+            60.0 / max(self.settings.REQUESTS_PER_MINUTE, 1)
+        )
+        if reddit_client is None and reddit_client_factory is None:
+            reddit_client_factory = self._build_reddit_client
+        self._client_factory = reddit_client_factory
+        # PRAW clients are not thread-safe: each in-flight fetch checks one
+        # out of this pool and returns it when done.
+        self._idle_clients: queue.SimpleQueue[praw.Reddit] = queue.SimpleQueue()
+        self._idle_clients.put(reddit_client or self._client_factory())
         self._subreddit_config_path = (
             Path(subreddit_config_path)
             if subreddit_config_path
             else Path(self.settings.SUBREDDIT_JSON_PATH)
         )
         self._default_subreddits_by_category = self._load_default_subreddits()
+        self._subreddits: dict[praw.Reddit, dict[str, praw.models.Subreddit]] = {}
 
     def _build_reddit_client(self) -> praw.Reddit:
         """Create a new authenticated PRAW client using configured settings."""
@@ -98,6 +139,66 @@ class RedditFetcher:
 
         return self._default_subreddits_by_category
 
+    @contextmanager
+    def _checkout_client(self) -> Iterator[praw.Reddit]:
+        """Lend a client to a single fetch for its whole duration.
+
+        An idle client is reused when available. Otherwise a new one is built
+        if there is a factory, or the caller waits for the shared client.
+        """
+
+        try:
+            reddit = self._idle_clients.get_nowait()
+        except queue.Empty:
+            reddit = (
+                self._client_factory()
+                if self._client_factory is not None
+                else self._idle_clients.get()
+            )
+        try:
+            yield reddit
+        finally:
+            self._idle_clients.put(reddit)
+
+    @staticmethod
+    def _collect_comments(
+        comments: Iterable, comment_limit: int
+    ) -> tuple[list[PostComment], bool]:
+        """Take up to ``comment_limit`` usable top-level comments.
+
+        Returns:
+            The normalized comments and whether an unexpanded
+            :class:`~praw.models.MoreComments` placeholder was skipped.
+        """
+
+        valid_comments: list[PostComment] = []
+        has_more = False
+        for comment in comments:
+            if isinstance(comment, MoreComments):
+                has_more = True
+                continue
+            body = comment.body
+            if not body or not body.strip():
+                continue
+            # author is None for deleted accounts
+            author = comment.author
+            author_name = str(author) if author else None
+            if author_name in SKIP_AUTHORS:
+                continue
+            created_utc = getattr(comment, "created_utc", None)
+            created_utc = created_utc if created_utc is not None else 0
+            valid_comments.append(
+                PostComment(
+                    body=body,
+                    author=author_name or constants.DEFAULT_COMMENT_AUTHOR_PLACEHOLDER,
+                    score=max(comment.score or 0, 0),
+                    created_utc=datetime.fromtimestamp(created_utc),
+                )
+            )
+            if len(valid_comments) >= comment_limit:
+                break
+        return valid_comments, has_more
+
     def fetch_subreddit_posts(
         self,
         subreddit_name: str,
@@ -121,56 +222,82 @@ class RedditFetcher:
             A list of validated :class:`~app.models.post.Post` instances.
         """
 
-        if method not in {"hot", "new", "top"}:
+        if method not in LISTING_METHODS:
             raise ValueError("Method must be one of 'hot', 'new', or 'top'.")
 
-        subreddit = self._reddit.subreddit(subreddit_name)
+        with self._checkout_client() as reddit:
+            self._listing_spacer.wait()
+            return self._fetch_listing(
+                reddit,
+                subreddit_name,
+                method,
+                required_posts,
+                comment_limit,
+                fetch_buffer,
+                max_post_age_days,
+            )
+
+    def _fetch_listing(
+        self,
+        reddit: praw.Reddit,
+        subreddit_name: str,
+        method: str,
+        required_posts: int,
+        comment_limit: int,
+        fetch_buffer: int,
+        max_post_age_days: int,
+    ) -> list[Post]:
+        """Body of :meth:`fetch_subreddit_posts`, run on a checked-out client."""
+
+        # Subreddit handles are lazy and hold no listing state, so one per
+        # name (and client) is reused across polls instead of rebuilt.
+        handles = self._subreddits.setdefault(reddit, {})
+        subreddit = handles.get(subreddit_name)
+        if subreddit is None:
+            subreddit = handles[subreddit_name] = reddit.subreddit(subreddit_name)
         listing_method = getattr(subreddit, method)
         normalized_posts: list[Post] = []
         collected_posts = 0
-        cutoff_timestamp = (
-            datetime.now(constants.TIMEZONE) - timedelta(days=max_post_age_days)
-        ).timestamp()
+        # one timestamp for the whole listing instead of a clock read per Post
+        fetched_at = datetime.now(constants.TIMEZONE)
+        cutoff_timestamp = (fetched_at - timedelta(days=max_post_age_days)).timestamp()
 
         for submission in listing_method(limit=fetch_buffer):
             if not submission.selftext.strip() and not submission.title.strip():
                 continue
 
             if submission.created_utc < cutoff_timestamp:
+                # "new" is ordered by creation time, so everything after the
+                # first stale submission is stale too; stop before PRAW
+                # requests another page.
+                if method == "new":
+                    break
                 continue
 
             try:
                 log.debug(
                     "Processing submission %s - %s", submission.id, submission.title
                 )
-                submission.comments.replace_more(limit=5)  # TODO: make it a constant
-
-                valid_comments: list[PostComment] = []
-                for comment in submission.comments:
-                    if not comment.body or not comment.body.strip():
-                        continue
-                    if comment.author == "AutoModerator":
-                        continue
-                    created_utc = getattr(comment, "created_utc", None)
-                    created_utc = created_utc if created_utc is not None else 0
-                    valid_comments.append(
-                        PostComment(
-                            body=comment.body,
-                            author=(
-                                str(comment.author)
-                                if comment.author
-                                else constants.DEFAULT_COMMENT_AUTHOR_PLACEHOLDER
-                            ),
-                            score=max(comment.score or 0, 0),
-                            created_utc=datetime.fromtimestamp(created_utc),
-                        )
+                # Only the first few top-level comments are kept, and the
+                # listing already carries them; expanding MoreComments is one
+                # extra request each, so it is a fallback, not the default.
+                valid_comments, has_more = self._collect_comments(
+                    submission.comments, comment_limit
+                )
+                if len(valid_comments) < comment_limit and has_more:
+                    submission.comments.replace_more(
+                        limit=constants.FALLBACK_REPLACE_MORE_LIMIT
+                    )
+                    valid_comments, _ = self._collect_comments(
+                        submission.comments, comment_limit
                     )
-                    if len(valid_comments) >= comment_limit:
-                        break
 
                 if len(valid_comments) < comment_limit:
                     continue
 
+                created_ts = datetime.fromtimestamp(
+                    submission.created_utc, tz=constants.TIMEZONE
+                )
                 post_model = Post(
                     post_id=submission.id,
                     post_title=submission.title,
@@ -178,11 +305,12 @@ class RedditFetcher:
                     post_url=f"https://reddit.com{submission.permalink}",
                     score=submission.score,
                     post_comment_count=submission.num_comments,
-                    post_created_ts=datetime.fromtimestamp(
-                        submission.created_utc, tz=constants.TIMEZONE
-                    ),
+                    post_created_ts=created_ts,
                     post_comments=valid_comments,
                     post_subreddit=subreddit_name,
+                    # a post created while the listing was paged through must
+                    # not predate its own processing time
+                    processing_timestamp=max(fetched_at, created_ts),
                 )
 
                 normalized_posts.append(post_model)
@@ -232,32 +360,57 @@ class RedditFetcher:
             else self.default_subreddits_by_category
         )
 
-        aggregated_results: dict[str, list[dict[str, list[Post]]]] = {}
-        for category_name, subreddit_names in subreddits_by_category.items():
-            aggregated_results[category_name] = []
-            for subreddit_name in subreddit_names:
-                time.sleep(constants.DEFAULT_FETCH_SLEEP_SECONDS)
-                posts = self.fetch_subreddit_posts(
-                    subreddit_name=subreddit_name,
-                    method=method,
-                    required_posts=posts_per_subreddit,
-                    comment_limit=comment_per_post,
-                    fetch_buffer=fetch_buffer,
-                )
-                aggregated_results[category_name].append(
-                    {"name": subreddit_name, "posts": posts}
-                )
+        # Subreddits are fetched on a small thread pool: each fetch is
+        # dominated by waiting on Reddit, so wall time approaches the slowest
+        # subreddit instead of the sum. Every worker uses its own client;
+        # listing starts share one spacer (REDDIT_REQUESTS_PER_MINUTE) and
+        # PRAW's header-based limiter paces the requests within a listing.
+        workers = (
+            max(self.settings.FETCH_CONCURRENCY, 1)
+            if self._client_factory is not None
+            else 1
+        )
+        with ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="reddit-fetch",
+        ) as pool:
+            futures = {
+                category_name: [
+                    (
+                        subreddit_name,
+                        pool.submit(
+                            self.fetch_subreddit_posts,
+                            subreddit_name=subreddit_name,
+                            method=method,
+                            required_posts=posts_per_subreddit,
+                            comment_limit=comment_per_post,
+                            fetch_buffer=fetch_buffer,
+                        ),
+                    )
+                    for subreddit_name in subreddit_names
+                ]
+                for category_name, subreddit_names in subreddits_by_category.items()
+            }
+
+            aggregated_results: dict[str, list[dict[str, list[Post]]]] = {}
+            for category_name, pending in futures.items():
+                aggregated_results[category_name] = []
+                for subreddit_name, future in pending:
+                    posts = future.result()
+                    aggregated_results[category_name].append(
+                        {"name": subreddit_name, "posts": posts}
+                    )
+                    log.info(
+                        "Fetched %s posts from %s in category %s",
+                        len(posts),
+                        subreddit_name,
+                        category_name,
+                    )
                 log.info(
-                    "Fetched %s posts from %s in category %s",
-                    len(posts),
-                    subreddit_name,
+                    "Completed fetching category %s with %s subreddits.",
                     category_name,
+                    len(aggregated_results[category_name]),
                 )
-            log.info(
-                "Completed fetching category %s with %s subreddits.",
-                category_name,
-                len(aggregated_results[category_name]),
-            )
         return aggregated_results
 
 
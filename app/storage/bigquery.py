@@ -1,12 +1,12 @@
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from functools import cache
 from typing import List, Callable
 
 from google.cloud import bigquery
 from google.cloud.bigquery import QueryJobConfig, ScalarQueryParameter
 from google.api_core import exceptions as google_exceptions
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
 from app import constants
 from app.config import BigQuerySettings, get_bigquery_settings
@@ -16,6 +16,29 @@ from app.logging_setup import setup_logging
 setup_logging()
 log = logging.getLogger("storage.bigquery")
 
+# Columns read back into SentimentSummary. Naming them keeps the query text
+# (and so BigQuery's result-cache key) stable if the table gains columns.
+HISTORY_COLUMNS = (
+    "joy",
+    "sadness",
+    "anger",
+    "fear",
+    "love",
+    "surprise",
+    "top_contributors",
+    "timestamp",
+)
+
+_SUMMARY_LIST_ADAPTER = TypeAdapter(List[SentimentSummary])
+
+
+def summary_time(summary: SentimentSummary) -> datetime | None:
+    """Return the snapshot time of a BigQuery row, parsing string timestamps."""
+    ts = summary.timestamp
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return ts
+
 
 class BigQueryRepo:
     """A wrapper for google.cloud.bigquery.Client"""
@@ -29,8 +52,18 @@ class BigQueryRepo:
         self.s: BigQuerySettings = (
             settings if settings is not None else get_bigquery_settings()
         )
-        self.client: bigquery.Client = bigquery.Client()
+        self.client: bigquery.Client = (
+            client if client is not None else bigquery.Client()
+        )
         self._now_fn = now_fn
+        # Built once so every range read sends byte-identical SQL; only the
+        # parameters vary, which lets BigQuery serve repeats from its cache.
+        self._history_query = (
+            f"SELECT {', '.join(HISTORY_COLUMNS)} "
+            f"FROM `{self.s.bq_dataset}.{self.s.bq_global_sentiment_history_table}` "
+            "WHERE DATE(timestamp) BETWEEN @start_date AND @end_date "
+            f"LIMIT {self.s.bq_global_sentiment_history_limit};"
+        )
 
     def insert_global_sentiment_history(
         self, aggregated_sentiment: SentimentSummary | dict
@@ -53,18 +86,92 @@ class BigQueryRepo:
             # return a sentinel error list so caller can decide; you could also raise
             return [{"error": "validation_failed"}]
 
-        row = summary.to_bq_dict()
-        table_id = f"{self.s.bq_dataset}.{self.s.bq_global_sentiment_history_table}"
         now = self._now_fn(constants.TIMEZONE).isoformat()
+        return self._insert_rows([self._history_row(summary, now)])
+
+    def insert_global_sentiment_history_batch(
+        self, summaries: list[SentimentSummary | dict]
+    ) -> list[dict]:
+        """
+        Insert many SentimentSummary rows with as few streaming requests as possible.
+
+        Rows share one ``timestamp``/``updated_at`` and are sent in slices of
+        ``constants.BQ_INSERT_BATCH_ROWS`` to stay under the streaming request
+        size cap. Entries that fail validation are skipped and reported; the
+        rest are still inserted.
+
+        Returns a list of insert errors whose ``index`` refers to the position
+        in ``summaries`` (empty list on success), or raises on API-level failures.
+        """
+        now = self._now_fn(constants.TIMEZONE).isoformat()
+        errors: list[dict] = []
+        rows: list[dict] = []
+        positions: list[int] = []
+        for i, item in enumerate(summaries):
+            try:
+                summary = (
+                    item
+                    if isinstance(item, SentimentSummary)
+                    else SentimentSummary.model_validate(item)
+                )
+            except ValidationError:
+                log.exception(
+                    "Summary %s failed validation; skipping it in the BQ batch.", i
+                )
+                errors.append({"index": i, "error": "validation_failed"})
+                continue
+            rows.append(self._history_row(summary, now))
+            positions.append(i)
+
+        step = constants.BQ_INSERT_BATCH_ROWS
+        for lo in range(0, len(rows), step):
+            for err in self._insert_rows(rows[lo : lo + step]):
+                # map the slice-relative index back to the caller's position
+                errors.append({**err, "index": positions[lo + err["index"]]})
+        return errors
+
+    def load_global_sentiment_history(self, summaries: list[SentimentSummary]) -> None:
+        """Append many SentimentSummary rows through a BigQuery load job.
+
+        Meant for backfills: a load job has no streaming cost or per-table row
+        rate limit. The real-time path keeps using streaming inserts so the
+        snapshot is queryable immediately.
+
+        Raises:
+            google.api_core.exceptions.GoogleAPICallError: if the job fails.
+        """
+        if not summaries:
+            return
+
+        now = self._now_fn(constants.TIMEZONE).isoformat()
+        rows = [self._history_row(summary, now) for summary in summaries]
+        table_id = f"{self.s.bq_dataset}.{self.s.bq_global_sentiment_history_table}"
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        self.client.load_table_from_json(rows, table_id, job_config=job_config).result()
+        log.info("Loaded %s sentiment snapshot(s) into %s", len(rows), table_id)
+
+    @staticmethod
+    def _history_row(summary: SentimentSummary, now: str) -> dict:
+        row = summary.to_bq_dict()
         row["timestamp"] = now
         row["updated_at"] = now
+        return row
 
+    def _insert_rows(self, rows: list[dict]) -> list[dict]:
+        table_id = f"{self.s.bq_dataset}.{self.s.bq_global_sentiment_history_table}"
         try:
-            errors = self.client.insert_rows_json(table_id, [row], retry=self.s.retry)
+            errors = self.client.insert_rows_json(table_id, rows, retry=self.s.retry)
             if errors:
                 log.error("BigQuery insert returned errors: %s", errors)
             else:
-                log.info("Inserted sentiment snapshot to BigQuery table %s", table_id)
+                log.info(
+                    "Inserted %s sentiment snapshot(s) to BigQuery table %s",
+                    len(rows),
+                    table_id,
+                )
             return errors
         except google_exceptions.GoogleAPICallError as e:
             log.exception("Google API error while inserting rows to BigQuery: %s", e)
@@ -85,28 +192,93 @@ class BigQueryRepo:
         Returns:
             List[SentimentSummary]: A list of SentimentSummary models
         """
+        job_config = QueryJobConfig(
+            query_parameters=[
+                ScalarQueryParameter("start_date", "DATE", start),
+                ScalarQueryParameter("end_date", "DATE", end),
+            ],
+            use_query_cache=True,
+        )
+
+        job = self.client.query(self._history_query, job_config=job_config)
+        return self._validate_rows(job.result())
+
+    def refresh_weekly_rollup(
+        self, num_days: int = 7, max_age: timedelta | None = None
+    ) -> None:
+        """Rebuild the weekly rollup table from the history table.
+
+        The API reads the rollup with a single ``list_rows`` call instead of
+        compiling a date-range query per request.
+
+        Args:
+            num_days (int): How many days back (from today, UTC) to keep.
+            max_age (timedelta | None): Skip the rebuild if the rollup table
+                was modified more recently than this.
+        """
+        table_id = f"{self.s.bq_dataset}.{self.s.bq_global_sentiment_weekly_table}"
+        if max_age is not None:
+            try:
+                modified = self.client.get_table(table_id).modified
+            except google_exceptions.NotFound:
+                modified = None
+            if modified is not None and (
+                self._now_fn(constants.TIMEZONE) - modified < max_age
+            ):
+                log.info("BigQuery rollup table %s is recent; not rebuilding", table_id)
+                return
+
         query = (
+            "CREATE OR REPLACE TABLE "
+            f"`{table_id}` AS "
             "SELECT * "
             f"FROM `{self.s.bq_dataset}.{self.s.bq_global_sentiment_history_table}` "
-            "WHERE DATE(timestamp) BETWEEN @start_date AND @end_date "
-            f"LIMIT {self.s.bq_global_sentiment_history_limit};"
+            f"WHERE DATE(timestamp) >= DATE_SUB(CURRENT_DATE(), INTERVAL {int(num_days)} DAY);"
+        )
+        self.client.query(query).result()
+        log.info(
+            "Refreshed BigQuery rollup table %s",
+            self.s.bq_global_sentiment_weekly_table,
         )
 
-        job_config = QueryJobConfig(
-            query_parameters=[
-                ScalarQueryParameter("start_date", "DATE", start),
-                ScalarQueryParameter("end_date", "DATE", end),
-            ]
+    def get_weekly_rollup(self, since: date | None = None) -> List[SentimentSummary]:
+        """Read the precomputed weekly rollup written by :meth:`refresh_weekly_rollup`.
+
+        Args:
+            since (date | None): Drop rows dated before this day, so the window
+                keeps sliding with the calendar between rebuilds.
+
+        Returns:
+            List[SentimentSummary]: A list of SentimentSummary models
+
+        Raises:
+            google.api_core.exceptions.NotFound: if the rollup was never built.
+        """
+        rows = self.client.list_rows(
+            f"{self.s.bq_dataset}.{self.s.bq_global_sentiment_weekly_table}",
+            max_results=self.s.bq_global_sentiment_history_limit,
         )
+        results = self._validate_rows(rows)
+        if since is None:
+            return results
+        return [
+            r
+            for r in results
+            if (ts := summary_time(r)) is not None and ts.date() >= since
+        ]
 
-        job = self.client.query(query, job_config=job_config)
-        rows = job.result()
+    @staticmethod
+    def _validate_rows(rows) -> List[SentimentSummary]:
+        raw = [dict(row.items()) for row in rows]
+        try:
+            # one pass through the compiled validator for the common all-good case
+            return _SUMMARY_LIST_ADAPTER.validate_python(raw)
+        except ValidationError:
+            pass
 
         results = []
-
-        for row in rows:
+        for row in raw:
             try:
-                row = dict(row.items())
                 validated = SentimentSummary.model_validate(row)
                 results.append(validated)
             except Exception:
@@ -115,6 +287,10 @@ class BigQueryRepo:
 
         return results
 
+    def healthcheck(self) -> None:
+        """Run a zero-byte query to open the BigQuery connection pool."""
+        self.client.query("SELECT 1").result()
+
 
 @cache
 def default_bq_repo() -> BigQueryRepo:
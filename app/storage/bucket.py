@@ -1,8 +1,11 @@
-import json
+import gzip
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 from functools import lru_cache
 
+import orjson
+from google.api_core.exceptions import PreconditionFailed
 from google.cloud import storage
 
 from app.logging_setup import setup_logging
@@ -31,10 +34,53 @@ class BucketRepo:
             bucket_name = self.s.GOOGLE_BUCKET_NAME
         bucket = self.client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
-        json_str = json.dumps(json_data, indent=2)
-        blob.upload_from_string(json_str, content_type="application/json")
+        # compact orjson bytes: the archive is machine-read, so indentation
+        # only inflated the upload
+        payload = orjson.dumps(json_data, option=orjson.OPT_SERIALIZE_NUMPY)
+        # Stored gzip-encoded; GCS and the storage client decompress on read,
+        # so readers still get plain JSON.
+        blob.content_encoding = "gzip"
+        try:
+            # generation 0 means "only if absent": archives are never
+            # overwritten, and the precondition makes the upload safe to retry
+            blob.upload_from_string(
+                gzip.compress(payload, compresslevel=6),
+                content_type="application/json",
+                if_generation_match=0,
+            )
+        except PreconditionFailed:
+            log.warning(
+                "gs://%s/%s already exists; not overwriting", bucket_name, blob_name
+            )
+            return
 
-        print(f"✅ Uploaded JSON to gs://{bucket_name}/{blob_name}")
+        log.info("✅ Uploaded JSON to gs://%s/%s", bucket_name, blob_name)
+
+    def upload_many_json(
+        self,
+        items: dict[str, Union[list, dict]],
+        bucket_name: str | None = None,
+        max_workers: int = 8,
+    ):
+        """Upload several JSON blobs concurrently.
+
+        Each item goes through :meth:`upload_json` on a thread pool sharing
+        this repo's client; the first failure is re-raised.
+
+        Args:
+            items (dict[str, dict|list]): Blob path mapped to its JSON object
+            bucket_name (str): GCS bucket name
+            max_workers (int): Maximum concurrent uploads
+        """
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            futures = [
+                pool.submit(self.upload_json, json_data, blob_name, bucket_name)
+                for blob_name, json_data in items.items()
+            ]
+            for future in futures:
+                future.result()
 
 
 @lru_cache(maxsize=1)
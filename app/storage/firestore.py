@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 from functools import lru_cache
 from typing import Dict, Sequence, List
 
-from google.api_core.retry import Retry
+from google.api_core.retry import AsyncRetry, Retry
 from google.cloud import firestore
 from pydantic import ValidationError
 
@@ -120,6 +120,16 @@ def _to_legacy_summary(new_summary: dict) -> dict:
     return legacy
 
 
+def _to_output_summary(raw: dict) -> dict:
+    """Normalize a stored doc and shape it per API_OUTPUT_SCHEMA."""
+    new_shape = _to_new_summary(raw)
+    return (
+        _to_legacy_summary(new_shape)
+        if app_settings.API_OUTPUT_SCHEMA == "legacy"
+        else new_shape
+    )
+
+
 ## ------------------------------------- ##
 ## Temporary legacy schema handling(end) ##
 ## ------------------------------------- ##
@@ -130,10 +140,20 @@ class FirestoreRepo:
         self,
         settings: StorageSettings | None = None,
         db: firestore.Client | None = None,
+        async_db: firestore.AsyncClient | None = None,
     ):
         self.s = settings if settings else get_storage_settings()
         self.db = db if db else firestore.Client(database=self.s.DATABASE_ID)
+        self._async_db = async_db
         self._retry = Retry(deadline=30.0)
+        self._async_retry = AsyncRetry(deadline=30.0)
+
+    @property
+    def async_db(self) -> firestore.AsyncClient:
+        """Async Firestore client used by the API read paths, created lazily."""
+        if self._async_db is None:
+            self._async_db = firestore.AsyncClient(database=self.s.DATABASE_ID)
+        return self._async_db
 
     def save_sentiment_summary(self, aggregated_sentiment: SentimentSummary) -> None:
         """
@@ -260,47 +280,96 @@ class FirestoreRepo:
             return {"error": "Firestore read failed."}
 
         try:
-            new_shape = _to_new_summary(doc.to_dict())
-            return (
-                _to_legacy_summary(new_shape)
-                if app_settings.API_OUTPUT_SCHEMA == "legacy"
-                else new_shape
+            return _to_output_summary(doc.to_dict())
+        except Exception:
+            log.exception(
+                f"failed to convert into valid format. Mode: {app_settings.API_OUTPUT_SCHEMA}"
             )
+
+    async def aget_latest_sentiment(self) -> Dict:
+        """Async variant of :meth:`get_latest_sentiment` using the AsyncClient."""
+        try:
+            doc = await (
+                self.async_db.collection(self.s.CURRENT_SENTIMENT_COLLECTION_NAME)
+                .document("global")
+                .get(retry=self._async_retry)
+            )
+            if not doc.exists:
+                return {"error": "No sentiment data found."}
+        except Exception:
+            log.exception("Failed to read latest sentiment")
+            return {"error": "Firestore read failed."}
+
+        try:
+            return _to_output_summary(doc.to_dict())
         except Exception:
             log.exception(
                 f"failed to convert into valid format. Mode: {app_settings.API_OUTPUT_SCHEMA}"
             )
 
+    def _history_query(self, client, num_days: int):
+        """Range query over the last ``num_days``, served by the timestamp index.
+
+        A window of N days normally holds N * SENTIMENT_SNAPSHOTS_PER_DAY + 1
+        snapshots, but history docs are keyed per hour, so extra runs can add
+        more. The query is newest-first so the limit drops the oldest ones;
+        callers reverse the results back into chronological order.
+        """
+        start_date = datetime.now(constants.TIMEZONE) - timedelta(days=num_days)
+        return (
+            client.collection(self.s.SENTIMENT_HISTORY_COLLECTION_NAME)
+            .where("timestamp", ">=", start_date)
+            .order_by("timestamp", direction=firestore.Query.DESCENDING)
+            .limit(num_days * constants.SENTIMENT_SNAPSHOTS_PER_DAY + 1)
+        )
+
     def get_recent_sentiment_history(self, num_days: int) -> list[Dict]:
         """Retrieve the sentiment history from Firestore (sentiment_history).
 
         Args:
             num_records (int): The number of data points to retrieve.
         """
-        now = datetime.now(constants.TIMEZONE)
-        start_date = now - timedelta(days=num_days)
         try:
-            docs = (
-                self.db.collection(self.s.SENTIMENT_HISTORY_COLLECTION_NAME)
-                .where("timestamp", ">=", start_date)
-                .stream(retry=self._retry)
+            docs = list(
+                self._history_query(self.db, num_days).stream(retry=self._retry)
             )
-            out = []
-            for d in docs:
-                new_shape = _to_new_summary(d.to_dict())
-                out.append(
-                    _to_legacy_summary(new_shape)
-                    if app_settings.API_OUTPUT_SCHEMA == "legacy"
-                    else new_shape
-                )
-            return out
+            return [_to_output_summary(d.to_dict()) for d in reversed(docs)]
+        except Exception:
+            log.exception("Failed to read sentiment history")
+            return []
+
+    async def aget_recent_sentiment_history(self, num_days: int) -> list[Dict]:
+        """Async variant of :meth:`get_recent_sentiment_history`.
+
+        Args:
+            num_days (int): How many days of history to retrieve.
+        """
+        try:
+            docs = self._history_query(self.async_db, num_days).stream(
+                retry=self._async_retry
+            )
+            newest_first = [d async for d in docs]
+            return [_to_output_summary(d.to_dict()) for d in reversed(newest_first)]
         except Exception:
             log.exception("Failed to read sentiment history")
             return []
 
     def healthcheck(self):
         """Perform a simple healthcheck for App Engine warm-up call"""
-        self.db.collection(self.s.CURRENT_SENTIMENT_COLLECTION_NAME).limit(1).stream()
+        list(
+            self.db.collection(self.s.CURRENT_SENTIMENT_COLLECTION_NAME)
+            .limit(1)
+            .stream()
+        )
+
+    async def ahealthcheck(self):
+        """Open the AsyncClient's gRPC channel with a one-document read."""
+        async for _ in (
+            self.async_db.collection(self.s.CURRENT_SENTIMENT_COLLECTION_NAME)
+            .limit(1)
+            .stream()
+        ):
+            pass
 
 
 @lru_cache(maxsize=1)
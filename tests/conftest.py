@@ -88,6 +88,7 @@ class DummyBigQuerySettings:
     bq_dataset = "sentiment_dataset"
     bq_global_sentiment_history_table = "sentiment_table"
     bq_global_sentiment_history_limit = "sentiemnt_limit"
+    bq_global_sentiment_weekly_table = "sentiment_weekly_table"
     retry = "sentiment_retry"
 
 
@@ -229,20 +230,23 @@ def sample_summary(sample_posts: list[Post]) -> SentimentSummary:
 def client(monkeypatch):
     """
     Provide a TestClient for API tests (rate limiter key customized for tests).
-    Firestore dependency is overridden with a MagicMock for endpoint-level tests.
+    The Firestore repo placed on app.state by the lifespan is a MagicMock for
+    endpoint-level tests.
     """
     main.app.state.limiter = Limiter(
         key_func=lambda r: r.headers.get("X-Test-Id", "testclient")
     )
 
+    # the route decorators are bound to main.limiter; start every test from zero
+    main.limiter.reset()
+
     fake_repo = MagicMock(spec=FirestoreRepo)
-    main.app.dependency_overrides[main.get_repo] = lambda: fake_repo
+    monkeypatch.setattr(main, "default_repo", lambda: fake_repo)
+    monkeypatch.setattr(main, "default_bq_repo", lambda: MagicMock(spec=BigQueryRepo))
 
     with TestClient(main.app) as test_client:
         yield test_client, fake_repo
 
-    main.app.dependency_overrides.clear()
-
 
 @pytest.fixture
 def legacy_output() -> dict:
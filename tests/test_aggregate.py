@@ -94,3 +94,44 @@ def test_compute_sentiment_average_zero_total():
 )
 def test_compute_sentiment_average_no_valid(posts):
     assert compute_sentiment_average(posts) == {}
+
+
+def test_compute_sentiment_average_ranks_top_three_contributors():
+    emotions = ["joy", "sadness", "anger", "fear", "love", "surprise"]
+    posts = [
+        {
+            "id": f"p{i}",
+            "post_score": 10,
+            "sentiment": {"joy": joy, "sadness": 1.0 - joy},
+        }
+        for i, joy in enumerate([0.2, 0.9, 0.5, 0.9, 0.1])
+    ]
+    result = compute_sentiment_average(posts)
+
+    joy = next(tc for tc in result.top_contributors if tc.emotion == "joy")
+    # equal scores mean equal weights; ties go to the later post
+    assert [p.post_id for p in joy.top_posts] == ["p3", "p1", "p2"]
+    contributions = [p.contribution for p in joy.top_posts]
+    assert contributions == sorted(contributions, reverse=True)
+    assert [tc.emotion for tc in result.top_contributors] == emotions
+
+
+def test_compute_sentiment_average_trusted_dicts_match_validated(sample_posts):
+    dicts = [p.to_python_dict() for p in sample_posts]
+
+    trusted = compute_sentiment_average(dicts, trusted=True)
+    validated = compute_sentiment_average(dicts)
+
+    assert trusted.model_dump() == validated.model_dump()
+
+
+def test_compute_sentiment_average_reads_sentiment_matrix(sample_posts):
+    emotions = ["joy", "sadness", "anger", "fear", "love", "surprise"]
+    matrix = np.array(
+        [[getattr(p.sentiment, e) for e in emotions] for p in sample_posts]
+    )
+
+    from_matrix = compute_sentiment_average(sample_posts, sentiment_matrix=matrix)
+    from_models = compute_sentiment_average(sample_posts)
+
+    assert from_matrix.model_dump() == pytest.approx(from_models.model_dump())
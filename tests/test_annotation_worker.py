@@ -58,6 +58,74 @@ def test_parse_json_variants():
     }
 
     assert aw.parse_json("not json") is None
+    assert aw.parse_json("} backwards {") is None
+
+    chatty = 'Sure! {"joy": 3} Hope that helps.'
+    assert aw.parse_json(chatty)["joy"] == 3
+    assert aw.parse_json(chatty)["anger"] == 1
+
+
+class CharTokenizer:
+    """One token per character; enough to exercise prompt assembly."""
+
+    pad_token_id = 0
+
+    def apply_chat_template(self, messages, tokenize, add_generation_prompt):
+        return f"<user>{messages[0]['content']}</user><assistant>"
+
+    def encode(self, text, add_special_tokens):
+        return [ord(c) for c in text]
+
+    def __call__(self, texts, add_special_tokens):
+        return {"input_ids": [self.encode(t, add_special_tokens) for t in texts]}
+
+    def decode(self, ids):
+        return "".join(chr(i) for i in ids)
+
+
+def test_prompt_encoder_matches_full_render_and_trims_post(monkeypatch):
+    monkeypatch.setattr(
+        aw, "prepare_for_input", lambda title, body, comments: f"{title}|{body}"
+    )
+    tok = CharTokenizer()
+
+    encoder = aw.PromptEncoder(tok, max_prompt_len=10_000)
+    first, second = encoder(["title", "t2"], ["body", "b2"], [[], None])
+    assert tok.decode(first) == aw.build_prompt(tok, "title", "body", [])
+    assert tok.decode(second) == aw.build_prompt(tok, "t2", "b2", [])
+
+    fixed = len(encoder.pre_ids) + len(encoder.post_ids)
+    short = aw.PromptEncoder(tok, max_prompt_len=fixed + 3)
+    [ids] = short(["title"], ["body"], [[]])
+    assert len(ids) == fixed + 3
+    # the instructions and generation prompt survive; only the post is cut
+    assert tok.decode(ids).endswith("Return JSON only.</user><assistant>")
+
+
+def test_read_chunk_reduces_comments_to_bodies():
+    from datasets import Dataset
+
+    ds = Dataset.from_list(
+        [
+            {
+                "id": f"p{i}",
+                "title": f"t{i}",
+                "text": f"b{i}",
+                "score": i,
+                "comments": [{"body": f"c{i}-{j}", "author": "x"} for j in range(i)],
+            }
+            for i in range(4)
+        ]
+    ).with_format("arrow")
+
+    chunk = aw.read_chunk(ds, 1, 2)
+
+    assert chunk == {
+        "id": ["p1", "p2"],
+        "title": ["t1", "t2"],
+        "text": ["b1", "b2"],
+        "comments": [["c1-0"], ["c2-0", "c2-1"]],
+    }
 
 
 def test_annotate_batch_builds_prompts_and_parses(monkeypatch):
@@ -65,17 +133,17 @@ def test_annotate_batch_builds_prompts_and_parses(monkeypatch):
         "id": ["abc123"],
         "title": ["My title"],
         "text": ["Body text"],
-        "comments": [[{"body": "Comment 1"}, {"body": "Comment 2"}]],
+        "comments": [["Comment 1", "Comment 2"]],
     }
 
     captured = {}
 
-    def fake_build_prompt(title, body, comments):
-        captured["args"] = (title, body, comments)
-        return "prompt"
+    def fake_encode_prompt(titles, bodies, comments):
+        captured["args"] = (titles, bodies, comments)
+        return [[1, 2, 3]]
 
     def fake_generate(pipe, prompts, base_bs, max_new_tokens):
-        assert prompts == ["prompt"]
+        assert prompts == [[1, 2, 3]]
         captured["batch"] = (pipe, base_bs, max_new_tokens)
         payload = json.dumps(
             {
@@ -87,20 +155,19 @@ def test_annotate_batch_builds_prompts_and_parses(monkeypatch):
                 "surprise": 7,
             }
         )
-        return [[{"generated_text": payload}]]
+        return [payload]
 
-    monkeypatch.setattr(aw, "build_prompt", fake_build_prompt)
     monkeypatch.setattr(aw, "generate_with_adaptive_bs", fake_generate)
 
     settings = SimpleNamespace(MAX_NEW_TOKENS=42)
-    pipe = object()
+    pipe = SimpleNamespace(encode_prompt=fake_encode_prompt)
 
     result = aw.annotate_batch(settings, dataset, pipe, batch_size=3)
 
     assert captured["args"] == (
-        "My title",
-        "Body text",
-        ["Comment 1", "Comment 2"],
+        ["My title"],
+        ["Body text"],
+        [["Comment 1", "Comment 2"]],
     )
     assert captured["batch"] == (pipe, 3, 42)
     assert result == [
@@ -119,6 +186,313 @@ def test_annotate_batch_builds_prompts_and_parses(monkeypatch):
     assert aw.metrics["json_parse_failures"] == 0
 
 
+def test_prepare_chunk_precomputes_prompts_for_annotate_batch(monkeypatch):
+    chunk = {"id": ["a"], "title": ["t"], "text": ["b"], "comments": [["c"]]}
+    monkeypatch.setattr(aw, "read_chunk", lambda ds, lo, hi: dict(chunk))
+    encoded = []
+
+    def encode_prompt(titles, bodies, comments):
+        encoded.append(titles)
+        return [[9]]
+
+    generator = SimpleNamespace(encode_prompt=encode_prompt)
+    prepared = aw.prepare_chunk(None, generator, 0, 0)
+    assert prepared["prompt_ids"] == [[9]]
+
+    def fake_generate(pipe, prompts, base_bs, max_new_tokens):
+        assert prompts == [[9]]
+        return ['{"joy": 4}']
+
+    monkeypatch.setattr(aw, "generate_with_adaptive_bs", fake_generate)
+    settings = SimpleNamespace(MAX_NEW_TOKENS=8)
+    [(pid, scores)] = aw.annotate_batch(settings, prepared, generator, batch_size=2)
+
+    assert (pid, scores["joy"]) == ("a", 4)
+    assert encoded == [["t"]]  # not re-encoded by annotate_batch
+
+
+def test_prepare_chunk_reuses_cached_prompts(monkeypatch, tmp_path):
+    chunk = {
+        "id": ["a", "b"],
+        "title": ["t", "u"],
+        "text": ["", ""],
+        "comments": [[], []],
+    }
+    monkeypatch.setattr(aw, "read_chunk", lambda ds, lo, hi: dict(chunk))
+    encoded = []
+
+    def encode_prompt(titles, bodies, comments):
+        encoded.append(titles)
+        return [[1, 2], [3]]
+
+    encoder = SimpleNamespace(pre_ids=[1], post_ids=[2], max_post_len=8)
+    generator = SimpleNamespace(encode_prompt=encode_prompt)
+    cache = aw.PromptCache(str(tmp_path), encoder, "model-A")
+
+    first = aw.prepare_chunk(None, generator, 0, 1, cache)
+    second = aw.prepare_chunk(None, generator, 0, 1, cache)
+
+    assert first["prompt_ids"] == second["prompt_ids"] == [[1, 2], [3]]
+    assert encoded == [["t", "u"]]
+    assert aw.metrics["prompt_cache_hits"] == 1
+    # a different model or template must not hit the same entry
+    other = aw.PromptCache(str(tmp_path), encoder, "model-B")
+    assert other.get(["a", "b"]) is None
+
+
+def test_annotate_batch_sends_whole_chunk_to_vllm(monkeypatch):
+    dataset = {
+        "id": ["a", "b"],
+        "title": ["t1", "t2"],
+        "text": ["b1", "b2"],
+        "comments": [[], []],
+    }
+    payload = (
+        '{"joy": 2, "sadness": 1, "anger": 1, "fear": 1, "love": 1, "surprise": 1}'
+    )
+
+    class FakeLLM:
+        def get_tokenizer(self):
+            return CharTokenizer()
+
+    calls = []
+
+    def fake_call(self, prompts, max_new_tokens):
+        calls.append((list(prompts), max_new_tokens))
+        return [payload for _ in prompts]
+
+    monkeypatch.setattr(aw.VllmGenerator, "__call__", fake_call)
+    monkeypatch.setattr(
+        aw,
+        "generate_with_adaptive_bs",
+        lambda *a, **k: pytest.fail("vLLM path must not re-batch"),
+    )
+
+    generator = aw.VllmGenerator(FakeLLM(), max_prompt_len=10_000)
+    generator.encode_prompt = lambda titles, bodies, comments: [
+        [ord(t[1])] for t in titles
+    ]
+    settings = SimpleNamespace(MAX_NEW_TOKENS=16)
+    result = aw.annotate_batch(settings, dataset, generator, batch_size=1)
+
+    assert calls == [([[ord("1")], [ord("2")]], 16)]
+    assert [pid for pid, _ in result] == ["a", "b"]
+    assert result[0][1]["joy"] == 2
+
+
+def test_hf_generator_pads_to_longest_and_decodes_new_tokens_only():
+    import torch
+
+    captured = {}
+
+    class FakeEncoding(dict):
+        def to(self, device, non_blocking=False):
+            captured["device"] = device
+            captured["non_blocking"] = non_blocking
+            return self
+
+    class FakeTokenizer(CharTokenizer):
+        def pad(self, features, padding, return_tensors):
+            captured["padding"] = padding
+            longest = max(len(ids) for ids in features["input_ids"])
+            rows = [
+                [self.pad_token_id] * (longest - len(ids)) + ids
+                for ids in features["input_ids"]
+            ]
+            return FakeEncoding(input_ids=torch.tensor(rows))
+
+        def batch_decode(self, ids, skip_special_tokens):
+            captured["decoded"] = ids.tolist()
+            return ["out"] * len(ids)
+
+    class FakeModel:
+        device = "cpu"
+
+        def generate(self, **kwargs):
+            captured["generate"] = kwargs
+            prompt = kwargs["input_ids"]
+            new = torch.full((prompt.shape[0], 2), 7, dtype=torch.long)
+            return torch.cat([prompt, new], dim=1)
+
+    generator = aw.HFGenerator(
+        FakeModel(), FakeTokenizer(), max_prompt_len=128, constrained=False
+    )
+    assert generator([[5], [5, 6, 7]], max_new_tokens=5) == ["out", "out"]
+
+    assert captured["padding"] == "longest"
+    assert captured["non_blocking"] is True
+    assert captured["generate"]["input_ids"].tolist() == [[0, 0, 5], [5, 6, 7]]
+    assert captured["generate"]["max_new_tokens"] == 5
+    assert captured["generate"]["do_sample"] is False
+    assert captured["generate"]["num_beams"] == 1
+    assert captured["generate"]["stop_strings"] == ["}"]
+    assert captured["decoded"] == [[7, 7], [7, 7]]
+
+
+def test_generate_with_adaptive_bs_batches_by_length_and_restores_order():
+    batches = []
+
+    def fake_generate(batch, max_new_tokens):
+        batches.append([len(ids) for ids in batch])
+        return [f"len{len(ids)}" for ids in batch]
+
+    prompts = [[1] * n for n in (2, 9, 1, 8)]
+    out = aw.generate_with_adaptive_bs(
+        fake_generate, prompts, base_bs=2, max_new_tokens=4
+    )
+
+    assert batches == [[9, 8], [2, 1]]
+    assert out == ["len2", "len9", "len1", "len8"]
+
+
+class PieceTokenizer:
+    """Tokenizer over an explicit list of vocabulary pieces."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.eos_token_id = pieces.index("<eos>")
+
+    def __len__(self):
+        return len(self.pieces)
+
+    def decode(self, ids):
+        return "".join(self.pieces[i] for i in ids)
+
+
+def test_score_grammar_forces_the_score_object():
+    import re
+
+    full = '{"joy": 10, "sadness": 2, "anger": 3, "fear": 4, "love": 5, "surprise": 6}'
+    assert re.fullmatch(aw.SCORE_REGEX, full)
+
+    pieces = sorted(set(full) | set("0123456789")) + ['{"joy": ', "10", "hi", "<eos>"]
+    tok = PieceTokenizer(pieces)
+    grammar = aw.ScoreGrammar(tok)
+
+    def allowed(text):
+        return {pieces[i] for i in grammar.allowed(text)}
+
+    assert allowed("") == {"{", '{"joy": '}
+    assert allowed('{"joy": ') == set("123456789") | {"10"}
+    assert allowed('{"joy": 1') == {"0", ","}
+    assert allowed('{"joy": 10') == {","}
+    assert allowed(full) == {"<eos>"}
+    assert aw.parse_json(full)["joy"] == 10
+
+
+def test_pick_attn_implementation_falls_back_to_sdpa(monkeypatch):
+    monkeypatch.setattr(aw.importlib.util, "find_spec", lambda name: object())
+    monkeypatch.setattr(aw.torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(aw.torch.cuda, "get_device_capability", lambda: (8, 0))
+    assert aw.pick_attn_implementation() == "flash_attention_2"
+
+    # Turing (T4) has no FlashAttention-2 kernels
+    monkeypatch.setattr(aw.torch.cuda, "get_device_capability", lambda: (7, 5))
+    assert aw.pick_attn_implementation() == "sdpa"
+
+    monkeypatch.setattr(aw.importlib.util, "find_spec", lambda name: None)
+    assert aw.pick_attn_implementation() == "sdpa"
+
+
+def test_upload_chunk_uploads_then_heartbeats(monkeypatch):
+    events = []
+    blob = SimpleNamespace(
+        upload_from_string=lambda payload, **kw: events.append(("upload", payload))
+    )
+    bucket = SimpleNamespace(blob=lambda name: blob)
+    monkeypatch.setattr(
+        aw,
+        "heartbeat",
+        lambda settings, tasks_ref, doc_id, inc_done: events.append(
+            ("heartbeat", doc_id, inc_done)
+        ),
+    )
+
+    aw._upload_chunk(None, bucket, None, "shard1", "a/chunk.jsonl", b"{}", 3)
+    assert events == [("upload", b"{}"), ("heartbeat", "shard1", 3)]
+
+
+def test_upload_chunk_still_heartbeats_when_blob_exists(monkeypatch):
+    def upload_from_string(payload, **kw):
+        raise aw.google_exceptions.PreconditionFailed("exists")
+
+    blob = SimpleNamespace(upload_from_string=upload_from_string)
+    bucket = SimpleNamespace(blob=lambda name: blob)
+    beats = []
+    monkeypatch.setattr(
+        aw,
+        "heartbeat",
+        lambda settings, tasks_ref, doc_id, inc_done: beats.append(inc_done),
+    )
+
+    aw._upload_chunk(None, bucket, None, "shard1", "a/chunk.jsonl", b"{}", 3)
+    assert beats == [3]
+
+
+def test_wait_uploads_bounds_in_flight_and_reraises():
+    from collections import deque
+    from concurrent.futures import Future
+
+    done, failed, running = Future(), Future(), Future()
+    done.set_result(None)
+    failed.set_exception(RuntimeError("upload failed"))
+
+    pending = deque([done, running])
+    aw._wait_uploads(pending, keep=1)
+    assert list(pending) == [running]
+
+    with pytest.raises(RuntimeError):
+        aw._wait_uploads(deque([failed]))
+
+
+def test_bnb_quantization_config_prefers_nf4():
+    nf4 = aw.bnb_quantization_config(SimpleNamespace(LOAD_4BT=True, LOAD_8BT=True))
+    assert nf4.load_in_4bit and nf4.bnb_4bit_quant_type == "nf4"
+    assert nf4.bnb_4bit_compute_dtype == aw.pick_compute_dtype()
+
+    int8 = aw.bnb_quantization_config(SimpleNamespace(LOAD_4BT=False, LOAD_8BT=True))
+    assert int8.load_in_8bit and not int8.load_in_4bit
+
+    assert (
+        aw.bnb_quantization_config(SimpleNamespace(LOAD_4BT=False, LOAD_8BT=False))
+        is None
+    )
+
+
+def test_lease_one_claims_first_eligible_task_in_one_transaction(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import MagicMock
+
+    monkeypatch.setattr(aw.firestore, "transactional", lambda fn: fn)
+    future = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    def snap(doc_id, **data):
+        s = MagicMock()
+        s.reference.id = doc_id
+        s.to_dict.return_value = data
+        return s
+
+    leased = snap("shard-1", status="IN_PROGRESS", lease_expires_at=future)
+    pending = snap("shard-2", status="PENDING", attempts=0)
+
+    tasks_ref = MagicMock()
+    query = tasks_ref.where.return_value.order_by.return_value.limit.return_value
+    query.stream.return_value = [leased, pending]
+    db = MagicMock()
+    tx = db.transaction.return_value
+
+    settings = SimpleNamespace(WORKER_ID="w1", LEASE_MIN=30)
+    assert aw.lease_one(settings, db, tasks_ref) == "shard-2"
+
+    query.stream.assert_called_once_with(transaction=tx)
+    tx.update.assert_called_once()
+    ref, update = tx.update.call_args.args
+    assert ref is pending.reference
+    assert update["status"] == "IN_PROGRESS"
+    assert update["lease_owner"] == "w1"
+    assert update["attempts"] == 1
+
+
 def test_gcs_prefix_builds_expected_path():
     settings = SimpleNamespace(
         GCS_PREFIX="annotations",
@@ -127,3 +501,32 @@ def test_gcs_prefix_builds_expected_path():
     )
     prefix = aw._gcs_prefix(settings, "shard42")
     assert prefix == "annotations/run1/shard42/workerA"
+
+
+def test_load_vllm_uses_same_compute_dtype_as_hf_path(monkeypatch):
+    import sys
+
+    import torch
+
+    captured = {}
+
+    class FakeLLM:
+        def __init__(self, **kwargs):
+            captured.update(kwargs)
+
+        def get_tokenizer(self):
+            return CharTokenizer()
+
+    monkeypatch.setitem(sys.modules, "vllm", SimpleNamespace(LLM=FakeLLM))
+    monkeypatch.setattr(aw, "pick_compute_dtype", lambda: torch.bfloat16)
+    settings = SimpleNamespace(
+        ANN_QUANTIZATION=None,
+        MAX_PROMPT_LEN=100,
+        MAX_NEW_TOKENS=16,
+        VLLM_GPU_MEMORY_UTILIZATION=0.9,
+        ANN_CONSTRAINED_DECODING=False,
+    )
+
+    aw.load_vllm("some/model", settings)
+
+    assert captured["dtype"] is torch.bfloat16
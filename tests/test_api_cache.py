@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from app.api.cache import async_cached, cached, single_flight
+
+
+@pytest.mark.asyncio
+async def test_async_cached_reuses_result_per_key():
+    calls = []
+
+    @async_cached(ttl=60)
+    async def read(key):
+        calls.append(key)
+        return {"key": key}
+
+    assert await read("a") == {"key": "a"}
+    assert await read("a") == {"key": "a"}
+    assert await read("b") == {"key": "b"}
+    assert calls == ["a", "b"]
+
+    read.cache_clear()
+    await read("a")
+    assert calls == ["a", "b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_async_cached_skips_rejected_results():
+    calls = 0
+
+    @async_cached(ttl=60, should_cache=lambda r: "error" not in r)
+    async def read():
+        nonlocal calls
+        calls += 1
+        return {"error": "boom"}
+
+    await read()
+    await read()
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_async_cached_coalesces_concurrent_misses():
+    calls = 0
+
+    @async_cached(ttl=60)
+    async def read():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(read() for _ in range(5)))
+    assert results == [1] * 5
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_releases_key():
+    calls = 0
+
+    @single_flight
+    async def read():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(read(), read(), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # a settled flight is not reused
+    with pytest.raises(RuntimeError):
+        await read()
+    assert calls == 2
+
+
+def test_cached_skips_results_rejected_by_predicate():
+    calls = []
+
+    @cached(ttl=60, should_cache=bool)
+    def load(key):
+        calls.append(key)
+        return [] if key == "empty" else [key]
+
+    assert load("a") == ["a"]
+    assert load("a") == ["a"]
+    assert load("empty") == []
+    assert load("empty") == []
+    assert calls == ["a", "empty", "empty"]
+
+    load.cache_clear()
+    load("a")
+    assert calls == ["a", "empty", "empty", "a"]
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+from unittest.mock import MagicMock
+
 from fastapi.testclient import TestClient
 
-from app.api.main import app, get_repo
+from app.api import main
+from app.api.main import app
 
 
 class InMemoryRepo:
@@ -20,49 +23,53 @@ class InMemoryRepo:
             31: [{"joy": 0.55, "sadness": 0.3, "anger": 0.15, "timestamp": "2025-06-30T12:00:00+00:00"}],
         }
 
-    def get_latest_sentiment(self) -> dict[str, float]:
+    async def aget_latest_sentiment(self) -> dict[str, float]:
         self.latest_calls += 1
         return {"joy": 0.75, "sadness": 0.15, "anger": 0.1}
 
-    def get_recent_sentiment_history(self, num_days: int) -> list[dict[str, float]]:
+    async def aget_recent_sentiment_history(
+        self, num_days: int
+    ) -> list[dict[str, float]]:
         self.history_calls.append(num_days)
         return self._history_responses[num_days]
 
     def healthcheck(self) -> None:
         self.healthcheck_calls += 1
 
+    async def ahealthcheck(self) -> None:
+        pass
+
 
 def test_backend_endpoints_work_together(monkeypatch):
     repo = InMemoryRepo()
-    monkeypatch.setitem(app.dependency_overrides, get_repo, lambda: repo)
-
-    try:
-        with TestClient(app) as client:
-            current_resp = client.get("/sentiment/current")
-            assert current_resp.status_code == 200
-            assert current_resp.json() == {"joy": 0.75, "sadness": 0.15, "anger": 0.1}
-            # Security headers are added via middleware.
-            assert current_resp.headers["x-content-type-options"].lower() == "nosniff"
-            assert current_resp.headers["strict-transport-security"].startswith("max-age=")
-
-            day_resp = client.get("/sentiment/day")
-            assert day_resp.status_code == 200
-            assert day_resp.json() == repo._history_responses[1]
-
-            week_resp = client.get("/sentiment/week")
-            assert week_resp.status_code == 200
-            assert week_resp.json() == repo._history_responses[7]
-
-            month_resp = client.get("/sentiment/month")
-            assert month_resp.status_code == 200
-            assert month_resp.json() == repo._history_responses[31]
-
-            warmup_resp = client.get("/_ah/warmup")
-            assert warmup_resp.status_code == 200
-            assert warmup_resp.json() == {"status": "ok"}
-    finally:
-        app.dependency_overrides.clear()
+    monkeypatch.setattr(main, "default_repo", lambda: repo)
+    monkeypatch.setattr(main, "default_bq_repo", MagicMock)
+
+    with TestClient(app) as client:
+        current_resp = client.get("/sentiment/current")
+        assert current_resp.status_code == 200
+        assert current_resp.json() == {"joy": 0.75, "sadness": 0.15, "anger": 0.1}
+        # Security headers are added via middleware.
+        assert current_resp.headers["x-content-type-options"].lower() == "nosniff"
+        assert current_resp.headers["strict-transport-security"].startswith("max-age=")
+
+        day_resp = client.get("/sentiment/day")
+        assert day_resp.status_code == 200
+        assert day_resp.json() == repo._history_responses[1]
+
+        week_resp = client.get("/sentiment/week")
+        assert week_resp.status_code == 200
+        assert week_resp.json() == repo._history_responses[7]
+
+        month_resp = client.get("/sentiment/month")
+        assert month_resp.status_code == 200
+        assert month_resp.json() == repo._history_responses[31]
+
+        warmup_resp = client.get("/_ah/warmup")
+        assert warmup_resp.status_code == 200
+        assert warmup_resp.json() == {"status": "ok"}
 
     assert repo.latest_calls == 1
     assert repo.history_calls == [1, 7, 31]
-    assert repo.healthcheck_calls == 1
+    # once from the lifespan warm-up, once from /_ah/warmup
+    assert repo.healthcheck_calls == 2
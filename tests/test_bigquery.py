@@ -1,4 +1,5 @@
 # test_bigquery.py
+from datetime import date
 from unittest.mock import MagicMock
 
 import pytest
@@ -56,3 +57,134 @@ def test_insert_global_sentiment_history_failure(
     bigquery_repo.client.insert_rows_json.side_effect = RuntimeError("boom")
     with pytest.raises(RuntimeError):
         _ = bigquery_repo.insert_global_sentiment_history(sample_summary)
+
+
+def test_healthcheck_runs_trivial_query(bigquery_repo, mock_bq_client):
+    bigquery_repo.healthcheck()
+
+    mock_bq_client.query.assert_called_once_with("SELECT 1")
+    mock_bq_client.query.return_value.result.assert_called_once()
+
+
+def test_refresh_weekly_rollup_rebuilds_table(bigquery_repo, mock_bq_client):
+    bigquery_repo.refresh_weekly_rollup(num_days=7)
+
+    (query,), _ = mock_bq_client.query.call_args
+    assert query.startswith(
+        "CREATE OR REPLACE TABLE `sentiment_dataset.sentiment_weekly_table`"
+    )
+    assert "FROM `sentiment_dataset.sentiment_table`" in query
+    assert "INTERVAL 7 DAY" in query
+    mock_bq_client.query.return_value.result.assert_called_once()
+
+
+def test_refresh_weekly_rollup_skips_recent_table(
+    bigquery_repo, mock_bq_client, get_constant_datetime
+):
+    from datetime import timedelta
+
+    mock_bq_client.get_table.return_value.modified = get_constant_datetime - timedelta(
+        hours=2
+    )
+    bigquery_repo.refresh_weekly_rollup(max_age=timedelta(days=1))
+    mock_bq_client.query.assert_not_called()
+
+    mock_bq_client.get_table.return_value.modified = get_constant_datetime - timedelta(
+        days=2
+    )
+    bigquery_repo.refresh_weekly_rollup(max_age=timedelta(days=1))
+    mock_bq_client.query.assert_called_once()
+
+
+def test_get_weekly_rollup_filters_rows_before_since(
+    bigquery_repo, mock_bq_client, sample_summary
+):
+    def row(ts):
+        r = MagicMock()
+        r.items.return_value = {
+            **sample_summary.model_dump(mode="json"),
+            "timestamp": ts,
+        }.items()
+        return r
+
+    mock_bq_client.list_rows.return_value = [
+        row("2025-01-01T00:00:00+00:00"),
+        row("2025-01-09T00:00:00+00:00"),
+    ]
+
+    results = bigquery_repo.get_weekly_rollup(since=date(2025, 1, 5))
+
+    assert len(results) == 1
+    assert str(results[0].timestamp).startswith("2025-01-09")
+
+
+def test_get_weekly_rollup_reads_rows_without_query(
+    bigquery_repo, mock_bq_client, sample_summary
+):
+    row = MagicMock()
+    row.items.return_value = sample_summary.model_dump(mode="json").items()
+    bad_row = MagicMock()
+    bad_row.items.return_value = {"joy": "no joy"}.items()
+    mock_bq_client.list_rows.return_value = [row, bad_row]
+
+    results = bigquery_repo.get_weekly_rollup()
+
+    assert [r.joy for r in results] == [sample_summary.joy]
+    (table_id,), _ = mock_bq_client.list_rows.call_args
+    assert table_id == "sentiment_dataset.sentiment_weekly_table"
+    mock_bq_client.query.assert_not_called()
+
+
+def test_insert_global_sentiment_history_batch_chunks_and_maps_indices(
+    bigquery_repo, sample_summary, get_constant_datetime, monkeypatch
+):
+    monkeypatch.setattr("app.constants.BQ_INSERT_BATCH_ROWS", 2)
+    bigquery_repo.client.insert_rows_json = MagicMock(
+        side_effect=[[], [{"index": 0, "errors": ["bad"]}]]
+    )
+
+    summaries = [sample_summary, {"joy": "no joy"}, sample_summary, sample_summary]
+    errors = bigquery_repo.insert_global_sentiment_history_batch(summaries)
+
+    calls = bigquery_repo.client.insert_rows_json.call_args_list
+    assert [len(call.args[1]) for call in calls] == [2, 1]
+    stamps = {row["timestamp"] for call in calls for row in call.args[1]}
+    assert stamps == {get_constant_datetime.isoformat()}
+    assert errors == [
+        {"index": 1, "error": "validation_failed"},
+        {"index": 3, "errors": ["bad"]},
+    ]
+
+
+def test_load_global_sentiment_history_appends_with_load_job(
+    bigquery_repo, sample_summary, get_constant_datetime
+):
+    bigquery_repo.client.load_table_from_json = MagicMock()
+
+    bigquery_repo.load_global_sentiment_history([sample_summary, sample_summary])
+
+    call = bigquery_repo.client.load_table_from_json.call_args
+    rows, table_id = call.args
+    assert table_id.endswith(bigquery_repo.s.bq_global_sentiment_history_table)
+    assert len(rows) == 2
+    assert all(r["timestamp"] == get_constant_datetime.isoformat() for r in rows)
+    assert call.kwargs["job_config"].write_disposition == "WRITE_APPEND"
+    bigquery_repo.client.load_table_from_json.return_value.result.assert_called_once()
+
+
+def test_history_range_query_text_is_stable(bigquery_repo, mock_bq_client):
+    mock_bq_client.query.return_value.result.return_value = []
+
+    bigquery_repo.get_global_sentiment_history_by_day_range(
+        date(2025, 1, 1), date(2025, 1, 2)
+    )
+    bigquery_repo.get_global_sentiment_history_by_day_range(
+        date(2025, 2, 1), date(2025, 2, 7)
+    )
+
+    (first, first_kw), (second, _) = [
+        (c.args[0], c.kwargs) for c in mock_bq_client.query.call_args_list
+    ]
+    assert first == second
+    assert "SELECT *" not in first
+    assert first_kw["job_config"].use_query_cache is True
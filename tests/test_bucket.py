@@ -1,3 +1,4 @@
+import gzip
 import json
 from types import SimpleNamespace
 from unittest.mock import MagicMock
@@ -34,8 +35,10 @@ def test_upload_json_uses_env_bucket(monkeypatch):
     mock_bucket.blob.assert_called_once_with("path/to/blob.json")
 
     (payload,), kwargs = mock_blob.upload_from_string.call_args
-    assert json.loads(payload) == {"key": "value"}
+    assert json.loads(gzip.decompress(payload)) == {"key": "value"}
     assert kwargs["content_type"] == "application/json"
+    assert kwargs["if_generation_match"] == 0
+    assert mock_blob.content_encoding == "gzip"
 
 
 def test_upload_json_with_explicit_bucket():
@@ -51,3 +54,34 @@ def test_upload_json_with_explicit_bucket():
 
     mock_client.bucket.assert_called_once_with("custom-bucket")
     mock_blob.upload_from_string.assert_called_once()
+
+
+def test_upload_json_does_not_overwrite_existing_archive():
+    from google.api_core.exceptions import PreconditionFailed
+
+    mock_client = MagicMock()
+    mock_blob = mock_client.bucket.return_value.blob.return_value
+    mock_blob.upload_from_string.side_effect = PreconditionFailed("exists")
+
+    repo = bucket.BucketRepo(
+        settings=SimpleNamespace(GOOGLE_BUCKET_NAME="bucket"), client=mock_client
+    )
+
+    repo.upload_json({"n": 1}, "blob.json")
+
+    mock_blob.upload_from_string.assert_called_once()
+
+
+def test_upload_many_json_uploads_every_item():
+    mock_client = MagicMock()
+    mock_bucket = mock_client.bucket.return_value
+
+    repo = bucket.BucketRepo(
+        settings=SimpleNamespace(GOOGLE_BUCKET_NAME="bucket"), client=mock_client
+    )
+
+    repo.upload_many_json({"a.json": {"n": 1}, "b.json": [2]})
+
+    blob_names = sorted(call.args[0] for call in mock_bucket.blob.call_args_list)
+    assert blob_names == ["a.json", "b.json"]
+    assert mock_bucket.blob.return_value.upload_from_string.call_count == 2
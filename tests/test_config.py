@@ -85,3 +85,19 @@ def test_bq_settings():
 
     assert settings.bq_dataset is not None
     assert settings.bq_global_sentiment_history_table is not None
+
+
+def test_history_retrieval_limit_is_int(storage_env):
+    storage_env.setenv("FIRESTORE_DATABASE_ID", "db")
+    limit = config.get_storage_settings().HISTORY_RETRIEVAL_LIMIT
+    assert limit == 180
+    assert isinstance(limit, int)
+
+
+def test_settings_are_frozen():
+    import pydantic
+
+    settings = config.AppSettings()
+    with pytest.raises(pydantic.ValidationError):
+        settings.API_OUTPUT_SCHEMA = "new"
+    assert hash(settings) == hash(config.AppSettings())
@@ -14,9 +14,14 @@ Note: These tests mock the Firestore client. They do not require a real GCP proj
 
 import pytest
 import types
-from datetime import datetime
-from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
 
+from google.cloud import firestore
+
+from app import constants
+from app.storage.firestore import FirestoreRepo
+from tests.conftest import DummyStorageSettings
 
 # ---------------------------
 # save_sentiment_summary
@@ -245,9 +250,59 @@ def test_get_recent_sentiment_history_success(firestore_repo, mock_db, sample_su
 
     # Verify query composition calls were made (defensive regression check)
     mock_db.collection.return_value.where.assert_called()
+    q.order_by.assert_called_once_with(
+        "timestamp", direction=firestore.Query.DESCENDING
+    )
+    q.limit.assert_called_once_with(7 * constants.SENTIMENT_SNAPSHOTS_PER_DAY + 1)
     q.stream.assert_called()
 
 
+class _FakeHistoryQuery:
+    """Applies order_by/limit to an in-memory list the way Firestore would."""
+
+    def __init__(self, docs):
+        self._docs = docs
+
+    def order_by(self, field, direction=firestore.Query.ASCENDING):
+        desc = direction == firestore.Query.DESCENDING
+        ordered = sorted(self._docs, key=lambda d: d.to_dict()[field], reverse=desc)
+        return _FakeHistoryQuery(ordered)
+
+    def limit(self, n):
+        return _FakeHistoryQuery(self._docs[:n])
+
+    def stream(self, retry=None):
+        return iter(self._docs)
+
+
+def test_get_recent_sentiment_history_keeps_newest_when_over_limit(
+    firestore_repo, mock_db, monkeypatch
+):
+    """
+    With hourly snapshots the window can hold more docs than the limit; the
+    oldest must be dropped and the rest returned oldest-first.
+    """
+    import app.storage.firestore as fs
+
+    monkeypatch.setattr(fs, "_to_output_summary", lambda d: d)
+    now = datetime.now(constants.TIMEZONE)
+    docs = []
+    for hours_ago in range(24):
+        doc = MagicMock()
+        doc.to_dict.return_value = {"timestamp": now - timedelta(hours=hours_ago)}
+        docs.append(doc)
+    mock_db.collection.return_value.where.return_value = _FakeHistoryQuery(docs)
+
+    results = firestore_repo.get_recent_sentiment_history(1)
+
+    limit = constants.SENTIMENT_SNAPSHOTS_PER_DAY + 1
+    stamps = [r["timestamp"] for r in results]
+    assert len(stamps) == limit
+    assert stamps[-1] == now
+    assert stamps == sorted(stamps)
+    assert stamps[0] == now - timedelta(hours=limit - 1)
+
+
 def test_get_recent_sentiment_history_failure(firestore_repo, mock_db, caplog):
     """
     If streaming fails, return an empty list and log an error.
@@ -262,6 +317,97 @@ def test_get_recent_sentiment_history_failure(firestore_repo, mock_db, caplog):
     assert any("Failed to read sentiment history" in m for m in caplog.messages)
 
 
+# ---------------------------
+# async reads (API path)
+# ---------------------------
+
+
+class _AsyncDocStream:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def mock_async_db():
+    db = MagicMock(name="firestore.AsyncClient")
+    db.collection.return_value.document.return_value.get = AsyncMock()
+    query = db.collection.return_value.where.return_value
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    query.stream.return_value = _AsyncDocStream([])
+    return db
+
+
+@pytest.fixture
+def async_firestore_repo(mock_db, mock_async_db):
+    return FirestoreRepo(
+        settings=DummyStorageSettings(), db=mock_db, async_db=mock_async_db
+    )
+
+
+@pytest.mark.asyncio
+async def test_aget_latest_sentiment_not_found(async_firestore_repo, mock_async_db):
+    fake_doc = MagicMock()
+    fake_doc.exists = False
+    mock_async_db.collection.return_value.document.return_value.get.return_value = (
+        fake_doc
+    )
+
+    result = await async_firestore_repo.aget_latest_sentiment()
+    assert result == {"error": "No sentiment data found."}
+
+
+@pytest.mark.asyncio
+async def test_aget_latest_sentiment_failure(async_firestore_repo, mock_async_db):
+    mock_async_db.collection.return_value.document.return_value.get.side_effect = (
+        RuntimeError("boom")
+    )
+
+    result = await async_firestore_repo.aget_latest_sentiment()
+    assert result == {"error": "Firestore read failed."}
+
+
+@pytest.mark.asyncio
+async def test_aget_recent_sentiment_history_streams_docs(
+    async_firestore_repo, mock_async_db, sample_summary, monkeypatch
+):
+    import app.storage.firestore as fs
+
+    monkeypatch.setattr(
+        fs, "app_settings", types.SimpleNamespace(API_OUTPUT_SCHEMA="new")
+    )
+    fake_doc = MagicMock()
+    fake_doc.to_dict.return_value = sample_summary.model_dump(mode="json")
+    q = mock_async_db.collection.return_value.where.return_value
+    q.stream.return_value = _AsyncDocStream([fake_doc, fake_doc])
+
+    results = await async_firestore_repo.aget_recent_sentiment_history(7)
+    assert results == [
+        sample_summary.model_dump(mode="json"),
+        sample_summary.model_dump(mode="json"),
+    ]
+    mock_async_db.collection.return_value.where.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_aget_recent_sentiment_history_failure(
+    async_firestore_repo, mock_async_db
+):
+    q = mock_async_db.collection.return_value.where.return_value
+    q.stream.side_effect = RuntimeError("boom")
+
+    assert await async_firestore_repo.aget_recent_sentiment_history(7) == []
+
+
 # ---------------------------
 # healthcheck
 # ---------------------------
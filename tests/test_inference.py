@@ -1,5 +1,6 @@
 from types import SimpleNamespace
 
+import torch
 
 from app.ml import inference
 
@@ -15,11 +16,30 @@ def teardown_module(module):
 def test_get_classifier_uses_cache(monkeypatch):
     calls = []
 
-    def fake_pipeline(task, model, truncation, top_k=None):
-        calls.append((task, model, truncation, top_k))
-        return f"pipeline-{len(calls)}"
+    class FakeModel:
+        def eval(self):
+            calls.append("eval")
+            return self
 
-    monkeypatch.setattr(inference, "pipeline", fake_pipeline)
+    def fake_tokenizer(model_id):
+        calls.append(("tokenizer", model_id))
+        return "tokenizer"
+
+    def fake_model(model_id):
+        calls.append(("model", model_id))
+        return FakeModel()
+
+    monkeypatch.setattr(
+        inference.AutoTokenizer, "from_pretrained", staticmethod(fake_tokenizer)
+    )
+    monkeypatch.setattr(
+        inference.AutoModelForSequenceClassification,
+        "from_pretrained",
+        staticmethod(fake_model),
+    )
+    monkeypatch.setattr(
+        inference, "configure_torch_threads", lambda: calls.append("threads")
+    )
     monkeypatch.setattr(
         inference,
         "settings",
@@ -29,25 +49,53 @@ def test_get_classifier_uses_cache(monkeypatch):
     first = inference.get_classifier()
     second = inference.get_classifier()
 
-    assert first == second == "pipeline-1"
-    assert calls == [("text-classification", "model-A", True, None)]
+    assert first is second
+    assert first[0] == "tokenizer"
+    assert calls == [
+        "threads",
+        ("tokenizer", "model-A"),
+        ("model", "model-A"),
+        "eval",
+    ]
+
+
+def test_configure_torch_threads_uses_settings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(inference.torch, "set_num_threads", calls.append)
+
+    def interop(n):
+        calls.append(("interop", n))
+        raise RuntimeError("already started")
+
+    monkeypatch.setattr(inference.torch, "set_num_interop_threads", interop)
+    monkeypatch.setattr(
+        inference,
+        "settings",
+        SimpleNamespace(INFER_INTRA_THREADS=3, INFER_INTEROP_THREADS=1),
+    )
+
+    inference.configure_torch_threads()  # a late interop call is not fatal
+
+    assert calls == [3, ("interop", 1)]
 
 
-def test_run_batch_inference_truncates_and_flattens(monkeypatch):
+def test_run_batch_inference_truncates_by_tokens_and_flattens(monkeypatch):
     captured = []
 
-    class DummyPipeline:
-        def __call__(self, texts):
-            captured.append(list(texts))
-            return [
-                [
-                    {"label": "joy", "score": 0.9},
-                    {"label": "sadness", "score": 0.1},
-                ]
-                for _ in texts
-            ]
-
-    monkeypatch.setattr(inference, "get_classifier", lambda: DummyPipeline())
+    def fake_tokenizer(texts, padding, truncation, max_length, return_tensors):
+        captured.append((list(texts), truncation, max_length))
+        return {"input_ids": torch.zeros((len(texts), 3), dtype=torch.long)}
+
+    class FakeModel:
+        config = SimpleNamespace(num_labels=2, id2label={0: "joy", 1: "sadness"})
+
+        def __call__(self, input_ids):
+            logits = torch.log(torch.tensor([[0.75, 0.25]])).repeat(len(input_ids), 1)
+            return SimpleNamespace(logits=logits)
+
+    monkeypatch.setattr(
+        inference, "get_classifier", lambda: (fake_tokenizer, FakeModel())
+    )
     monkeypatch.setattr(
         inference,
         "settings",
@@ -57,8 +105,8 @@ def test_run_batch_inference_truncates_and_flattens(monkeypatch):
     texts = ["abcdefgh", "ijklmnop"]
     results = inference.run_batch_inference(texts, batch_size=1)
 
-    assert captured == [["abcde"], ["ijklm"]]
-    assert results == [
-        {"joy": 0.9, "sadness": 0.1},
-        {"joy": 0.9, "sadness": 0.1},
-    ]
+    assert captured == [(["abcdefgh"], True, 5), (["ijklmnop"], True, 5)]
+    assert [set(r) for r in results] == [{"joy", "sadness"}] * 2
+    for r in results:
+        assert abs(r["joy"] - 0.75) < 1e-6
+        assert abs(r["sadness"] - 0.25) < 1e-6
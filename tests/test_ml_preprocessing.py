@@ -154,6 +154,29 @@ def test_clean_text_full_pipeline():
     assert cleaned == "Hello & world quoted line visit link"
 
 
+@pytest.mark.parametrize(
+    "text",
+    [
+        "> quoted [a](b) and https://x.com/y\n>> [multi\n> line](u) done",
+        "see https://x.com[a](b) then [text](https://y.com)",
+        "[anchor with https://inner.com](u) tail",
+    ],
+)
+def test_clean_text_fused_pass_matches_separate_passes(text):
+    separate = clean_text(
+        drop_bare_urls(remove_markdown_links(strip_blockquotes(text))),
+        strip_quotes=False,
+        remove_md_links=False,
+        remove_urls=False,
+    )
+    assert clean_text(text) == separate
+
+
+def test_clean_text_keeps_text_after_url_anchor():
+    # the separate passes let the unwrapped anchor URL swallow the next word
+    assert clean_text("[https://a.com](u)word") == "word"
+
+
 def test_prepare_for_input_basic():
     """Ensure prepare_for_input builds the expected formatted string."""
     title = "Hello"
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Iterable
 
+from praw.models import MoreComments
+
 from app import constants
 from app.config import RedditSettings
 from app.models.post import Post
-from app.reddit.fetch import RedditFetcher
+from app.reddit.fetch import RedditFetcher, _RequestSpacer
 
 
 class DummyComment:
@@ -78,6 +82,8 @@ def _settings(tmp_path: Path | None = None) -> RedditSettings:
         USER_AGENT="agent",
         USERNAME="user",
         SUBREDDIT_JSON_PATH=str(subreddit_path),
+        # keep listing-start spacing out of the way of test run time
+        REQUESTS_PER_MINUTE=6000,
     )
 
 
@@ -125,6 +131,109 @@ def test_fetch_subreddit_posts_filters_invalid_comments():
     assert posts[0].post_comments[1].score == 0
 
 
+def test_fetch_subreddit_posts_skips_bot_authors():
+    submission = _submission_with_comments(
+        "bots",
+        [
+            DummyComment("Reminder set", "RemindMeBot", 1, None),
+            DummyComment("Removed, see rules", "AutoModerator", 1, None),
+            DummyComment("Real reply", "human", 1, None),
+        ],
+    )
+    fetcher = RedditFetcher(
+        settings=_settings(), reddit_client=DummyReddit({"python": [submission]})
+    )
+
+    posts = fetcher.fetch_subreddit_posts("python", required_posts=1, comment_limit=1)
+
+    assert [c.author for c in posts[0].post_comments] == ["human"]
+
+
+def test_fetch_subreddit_posts_expands_more_comments_only_when_short():
+    class ExpandableComments(DummyComments):
+        def replace_more(self, limit: int):
+            super().replace_more(limit)
+            self[:] = [c for c in self if not isinstance(c, MoreComments)]
+            self.append(DummyComment("Expanded reply", "late_user", 1, None))
+
+    placeholder = MoreComments.__new__(MoreComments)
+    enough = _submission_with_comments(
+        "enough", [DummyComment("First", "u1", 1, None), placeholder]
+    )
+    short = _submission_with_comments(
+        "short", [DummyComment("First", "u1", 1, None), placeholder]
+    )
+    enough.comments = ExpandableComments(enough.comments)
+    short.comments = ExpandableComments(short.comments)
+
+    fetcher = RedditFetcher(
+        settings=_settings(),
+        reddit_client=DummyReddit({"python": [enough], "golang": [short]}),
+    )
+
+    enough_posts = fetcher.fetch_subreddit_posts("python", required_posts=1, comment_limit=1)
+    short_posts = fetcher.fetch_subreddit_posts("golang", required_posts=1, comment_limit=2)
+
+    assert not hasattr(enough.comments, "limit_called")
+    assert len(enough_posts[0].post_comments) == 1
+    assert short.comments.limit_called == constants.FALLBACK_REPLACE_MORE_LIMIT
+    assert [c.body for c in short_posts[0].post_comments] == ["First", "Expanded reply"]
+
+
+def test_fetch_subreddit_posts_new_stops_at_age_cutoff():
+    comment = DummyComment("Nice!", "user1", 2, None)
+    fresh = _submission_with_comments("fresh", [comment])
+    stale = _submission_with_comments("stale", [comment])
+    stale.created_utc = (
+        datetime.now(constants.TIMEZONE) - timedelta(days=30)
+    ).timestamp()
+    seen: list[str] = []
+
+    class TrackingSubreddit(DummySubreddit):
+        def new(self, limit: int):
+            for submission in self._submissions[:limit]:
+                seen.append(submission.id)
+                yield submission
+
+    class TrackingReddit(DummyReddit):
+        def subreddit(self, name: str) -> DummySubreddit:
+            return TrackingSubreddit(self._mapping[name])
+
+    fetcher = RedditFetcher(
+        settings=_settings(),
+        reddit_client=TrackingReddit({"python": [fresh, stale, fresh]}),
+    )
+
+    posts = fetcher.fetch_subreddit_posts(
+        "python", method="new", required_posts=5, comment_limit=1
+    )
+
+    assert [p.post_id for p in posts] == ["fresh"]
+    assert seen == ["fresh", "stale"]
+
+
+def test_fetch_subreddit_posts_share_one_processing_timestamp():
+    comments = [DummyComment("first", "a", 1, None), DummyComment("second", "b", 1, None)]
+    submissions = [
+        _submission_with_comments(pid, comments) for pid in ("p1", "p2", "p3")
+    ]
+    # created "after" the fetch started: must not predate its processing time
+    submissions[1].created_utc = (
+        datetime.now(constants.TIMEZONE) + timedelta(seconds=30)
+    ).timestamp()
+
+    fetcher = RedditFetcher(
+        settings=_settings(), reddit_client=DummyReddit({"python": submissions})
+    )
+    posts = fetcher.fetch_subreddit_posts(
+        subreddit_name="python", required_posts=3, comment_limit=2, fetch_buffer=5
+    )
+
+    assert len(posts) == 3
+    assert posts[0].processing_timestamp == posts[2].processing_timestamp
+    assert posts[1].processing_timestamp == posts[1].post_created_ts
+
+
 def test_fetch_all_subreddit_posts_by_dict_returns_structure(monkeypatch):
     comment = DummyComment("Nice!", "user1", 2, None)
     submission_one = _submission_with_comments("sub1", [comment])
@@ -151,3 +260,122 @@ def test_fetch_all_subreddit_posts_by_dict_returns_structure(monkeypatch):
     assert len(result["tech"]) == 2
     assert {entry["name"] for entry in result["tech"]} == {"python", "golang"}
     assert all(entry["posts"] for entry in result["tech"])
+
+
+def test_fetch_all_subreddit_posts_by_dict_keeps_order():
+    comment = DummyComment("Nice!", "user1", 2, None)
+    names = ["a", "b", "c", "d"]
+    mapping = {name: [_submission_with_comments(name, [comment])] for name in names}
+    fetcher = RedditFetcher(
+        settings=_settings(),
+        reddit_client=DummyReddit(mapping),
+        reddit_client_factory=lambda: DummyReddit(mapping),
+    )
+
+    result = fetcher.fetch_all_subreddit_posts_by_dict(
+        subreddit_mapping={"first": ["a", "b"], "second": ["c", "d"]},
+        posts_per_subreddit=1,
+        comment_per_post=1,
+        fetch_buffer=2,
+    )
+
+    assert list(result) == ["first", "second"]
+    assert [entry["name"] for entry in result["first"]] == ["a", "b"]
+    assert [entry["name"] for entry in result["second"]] == ["c", "d"]
+
+
+def test_fetch_all_subreddit_posts_by_dict_never_shares_a_client():
+    comment = DummyComment("Nice!", "user1", 2, None)
+    names = [f"sub{i}" for i in range(8)]
+    mapping = {name: [_submission_with_comments(name, [comment])] for name in names}
+    lock = threading.Lock()
+    clients: list[DummyReddit] = []
+    overlaps: list[str] = []
+
+    class ExclusiveReddit(DummyReddit):
+        busy = False
+
+        def subreddit(self, name: str) -> DummySubreddit:
+            client = self
+
+            class SlowSubreddit(DummySubreddit):
+                def hot(self, limit: int):
+                    with lock:
+                        if client.busy:
+                            overlaps.append(name)
+                        client.busy = True
+                    try:
+                        time.sleep(0.02)
+                        yield from super().hot(limit)
+                    finally:
+                        client.busy = False
+
+            return SlowSubreddit(self._mapping[name])
+
+    def factory() -> DummyReddit:
+        client = ExclusiveReddit(mapping)
+        with lock:
+            clients.append(client)
+        return client
+
+    fetcher = RedditFetcher(settings=_settings(), reddit_client_factory=factory)
+
+    # required_posts exceeds what each listing holds, so every listing is
+    # read to the end and the busy flag is cleared before the client returns
+    result = fetcher.fetch_all_subreddit_posts_by_dict(
+        subreddit_mapping={"all": names},
+        posts_per_subreddit=2,
+        comment_per_post=1,
+        fetch_buffer=5,
+    )
+
+    assert [entry["name"] for entry in result["all"]] == names
+    assert overlaps == []
+    assert 1 < len(clients) <= fetcher.settings.FETCH_CONCURRENCY
+
+
+def test_fetch_all_concurrent_is_not_slower_than_serial():
+    comment = DummyComment("Nice!", "user1", 2, None)
+    names = [f"sub{i}" for i in range(8)]
+    mapping = {name: [_submission_with_comments(name, [comment])] for name in names}
+
+    class SlowReddit(DummyReddit):
+        def subreddit(self, name: str) -> DummySubreddit:
+            class SlowSubreddit(DummySubreddit):
+                def hot(self, limit: int):
+                    time.sleep(0.05)  # stands in for the listing round trip
+                    yield from super().hot(limit)
+
+            return SlowSubreddit(self._mapping[name])
+
+    def timed_run(concurrency: int) -> float:
+        settings = _settings().model_copy(update={"FETCH_CONCURRENCY": concurrency})
+        fetcher = RedditFetcher(
+            settings=settings, reddit_client_factory=lambda: SlowReddit(mapping)
+        )
+        started = time.perf_counter()
+        fetcher.fetch_all_subreddit_posts_by_dict(
+            subreddit_mapping={"all": names},
+            posts_per_subreddit=2,
+            comment_per_post=1,
+            fetch_buffer=5,
+        )
+        return time.perf_counter() - started
+
+    serial = timed_run(1)
+    concurrent = timed_run(4)
+
+    assert concurrent < serial
+
+
+def test_request_spacer_spaces_calls_across_threads(monkeypatch):
+    clock = [100.0]
+    sleeps: list[float] = []
+    monkeypatch.setattr("app.reddit.fetch.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr("app.reddit.fetch.time.sleep", sleeps.append)
+
+    spacer = _RequestSpacer(0.5)
+    for _ in range(3):
+        spacer.wait()
+
+    assert sleeps == [0.5, 1.0]
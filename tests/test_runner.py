@@ -6,6 +6,7 @@ from datetime import datetime
 from typing import Any
 from unittest.mock import Mock
 
+import numpy as np
 import pytest
 
 from app.jobs import runner
@@ -44,12 +45,17 @@ class DummyBucket:
 class DummyBQRepo:
     def __init__(self) -> None:
         self.inserts: list = []
+        self.rollup_refreshes = 0
 
     def insert_global_sentiment_history(self, aggregated_sentiment):
         # mirror BigQueryRepo API: return [] on success
         self.inserts.append(aggregated_sentiment)
         return []
 
+    def refresh_weekly_rollup(self, max_age=None):
+        self.rollup_refreshes += 1
+        self.rollup_max_age = max_age
+
 
 def _build_post(post_id: str, subreddit: str, score: int) -> Post:
     return Post(
@@ -91,8 +97,12 @@ def test_runner_main_full_pipeline(monkeypatch: pytest.MonkeyPatch) -> None:
             "surprise": 0.0,
         },
     ]
-    inference_mock = Mock(return_value=predictions)
-    monkeypatch.setattr(runner, "run_batch_inference", inference_mock)
+    labels = list(predictions[0])
+    probs = np.array([[p[label] for label in labels] for p in predictions])
+    inference_mock = Mock(return_value=(labels, probs))
+    monkeypatch.setattr(runner, "run_batch_inference_matrix", inference_mock)
+    warm_up_mock = Mock()
+    monkeypatch.setattr(runner, "warm_up", warm_up_mock)
 
     repo = DummyRepo()
     monkeypatch.setattr(runner, "default_repo", lambda: repo)
@@ -119,6 +129,7 @@ def test_runner_main_full_pipeline(monkeypatch: pytest.MonkeyPatch) -> None:
         method="hot", posts_per_subreddit=2, comment_per_post=2, fetch_buffer=5
     )
 
+    warm_up_mock.assert_called_once_with()
     assert inference_mock.call_count == 1
     inference_input = inference_mock.call_args.args[0]
     assert isinstance(inference_input, list)
@@ -166,6 +177,8 @@ def test_runner_main_full_pipeline(monkeypatch: pytest.MonkeyPatch) -> None:
     inserted = bq_repo.inserts[0]
     assert inserted.joy == repo.history_calls[0].joy
     assert inserted.surprise == repo.history_calls[0].surprise
+    assert bq_repo.rollup_refreshes == 1
+    assert bq_repo.rollup_max_age.total_seconds() == constants.WEEKLY_ROLLUP_REFRESH_SECONDS
 
     # The runner should not mutate the predictions list that was supplied by the inference mock.
     assert predictions[0]["joy"] == pytest.approx(0.7)